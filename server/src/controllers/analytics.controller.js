@@ -51,7 +51,10 @@ export const forensicSearch = asyncHandler(async (req, res) => {
     const detectionPayload = await detectFaceInWorker(req.file.buffer, req.file.originalname, true);
     if (!detectionPayload.result.faceDetected) throw new ApiError(400, "No face detected in suspect image");
 
-    const targetEmbedding = detectionPayload.result.faces[0].embedding;
+    // Faces below the worker's quality gate come back without an embedding
+    const suspect = detectionPayload.result.faces.find((face) => face.embedding);
+    if (!suspect) throw new ApiError(400, "Face image quality too low for forensic search");
+    const targetEmbedding = suspect.embedding;
 
     // 2. Search historical logs
     const matches = await searchByEmbedding(targetEmbedding);
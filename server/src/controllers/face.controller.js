@@ -59,6 +59,9 @@ const registerFace = asyncHandler(async (req, res) => {
     }
 
     const embedding = detectionResult.faces[0].embedding;
+    if (!embedding) {
+        throw new ApiError(400, "Face image quality too low for registration");
+    }
 
     const registrationData = {
         name,
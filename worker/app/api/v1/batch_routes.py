@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import tarfile
+import threading
+import zipfile
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.core.config import settings
+from app.services.batch_jobs import batch_jobs
+from app.services.video_jobs import start_video_job
+from app.services.inference_executor import QueueFullError
+from app.utils.serialization import to_jsonable
+from app.api.v1.face_routes import check_profile, analyze_static, annotate_clusters
+
+router = APIRouter()
+
+class VideoJobRequest(BaseModel):
+    path: str
+    profile: Optional[str] = None
+    every_n: int = 5
+    scene_threshold: float = 0.0
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+def _is_image(name):
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+def _archive_sources(archive: UploadFile):
+    """
+    (name, read) pairs for the images inside a zip or tar upload; members are
+    read as the pipeline gets to them, one at a time since they all share the
+    upload's file object.
+    """
+    lock = threading.Lock()
+
+    def serialized(read):
+        def locked():
+            with lock:
+                return read()
+        return locked
+
+    archive.file.seek(0)
+    if zipfile.is_zipfile(archive.file):
+        archive.file.seek(0)
+        bundle = zipfile.ZipFile(archive.file)
+        return [
+            (info.filename, serialized(lambda info=info: bundle.read(info)))
+            for info in bundle.infolist() if not info.is_dir() and _is_image(info.filename)
+        ]
+    archive.file.seek(0)
+    try:
+        bundle = tarfile.open(fileobj=archive.file, mode="r:*")
+    except tarfile.TarError:
+        raise HTTPException(status_code=400, detail="Archive must be a zip or tar file")
+    return [
+        (member.name, serialized(lambda member=member: bundle.extractfile(member).read()))
+        for member in bundle.getmembers() if member.isfile() and _is_image(member.name)
+    ]
+
+async def _run_one(index, name, read, profile, slots):
+    async with slots:
+        try:
+            image_bytes = await run_in_threadpool(read)
+        except Exception as e:
+            return {"index": index, "name": name, "error": str(e)}
+        while True:
+            try:
+                result, timing = await analyze_static(image_bytes, profile=profile)
+                await annotate_clusters(result, learn=not timing.get("cached"))
+                return {"index": index, "name": name, "result": result, "timing": timing}
+            except QueueFullError:
+                # Interactive traffic has the pool; back off rather than fail the image
+                await asyncio.sleep(0.05)
+            except Exception as e:
+                return {"index": index, "name": name, "error": str(e)}
+
+@router.post("/detect/batch")
+async def detect_batch(files: List[UploadFile] = File(None), archive: Optional[UploadFile] = File(None),
+                       profile: Optional[str] = None, concurrency: Optional[int] = None):
+    """
+    Static analysis of many images in one request: a multipart list of
+    `files` or one zip/tar `archive`. Results stream back as NDJSON, one line
+    per image in completion order, then a final `summary` line.
+    """
+    check_profile(profile)
+    if archive is not None:
+        sources = await run_in_threadpool(_archive_sources, archive)
+    elif files:
+        sources = [(upload.filename, upload.file.read) for upload in files]
+    else:
+        raise HTTPException(status_code=400, detail="Send images as 'files' or one 'archive'")
+
+    job = batch_jobs.create(len(sources))
+    # Enough in flight to keep every worker busy without monopolising the admission queue
+    slots = asyncio.Semaphore(max(1, min(concurrency or settings.inference_workers * 2, settings.inference_workers * 4)))
+
+    async def stream():
+        yield json.dumps({"job": job.job_id, "total": job.total}) + "\n"
+        pending = [
+            asyncio.ensure_future(_run_one(index, name, read, profile, slots))
+            for index, (name, read) in enumerate(sources)
+        ]
+        try:
+            for finished in asyncio.as_completed(pending):
+                line = await finished
+                if "error" in line:
+                    job.record(failed=True)
+                else:
+                    job.record(faces=line["result"]["totalFaces"])
+                yield json.dumps(to_jsonable(line)) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+            job.finish()
+        yield json.dumps({"summary": job.stats()}) + "\n"
+
+    return StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE, headers={"X-Job-Id": job.job_id})
+
+@router.get("/jobs")
+async def list_jobs():
+    return batch_jobs.stats()
+
+@router.get("/jobs/{job_id}")
+async def job_progress(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.stats()
+
+@router.post("/video/jobs", status_code=202)
+async def create_video_job(request: VideoJobRequest):
+    """
+    Starts an offline pass over a local video file; poll the job for progress
+    and its per-track summary.
+    """
+    check_profile(request.profile)
+    try:
+        job = await run_in_threadpool(
+            start_video_job, request.path, request.profile, request.every_n, request.scene_threshold
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.stats()
+
+@router.get("/video/jobs/{job_id}")
+async def video_job_result(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None or job.kind != "video":
+        raise HTTPException(status_code=404, detail=f"Video job '{job_id}' not found")
+    return to_jsonable({**job.stats(), "summary": job.result})
@@ -0,0 +1,40 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from app.services.face_clusters import face_clusters
+
+router = APIRouter()
+
+class ClusterQuery(BaseModel):
+    embedding: List[float]
+    k: int = Field(5, ge=1, le=100)
+    min_score: Optional[float] = Field(None, ge=-1.0, le=1.0)
+
+@router.get("/clusters")
+async def list_clusters(min_members: int = 1, stream_id: Optional[str] = None, limit: int = 100):
+    """
+    Unknown-face clusters, most recently seen first; `min_members` > 1 lists repeat visitors.
+    """
+    clusters = await run_in_threadpool(face_clusters.list, min_members, stream_id, limit)
+    return {"stats": face_clusters.stats(), "clusters": clusters}
+
+@router.get("/clusters/{cluster_id}")
+async def get_cluster(cluster_id: int):
+    # Ids of merged clusters resolve to the cluster that absorbed them
+    cluster = face_clusters.get(cluster_id)
+    if cluster is None:
+        raise HTTPException(status_code=404, detail=f"Cluster {cluster_id} not found")
+    return cluster
+
+@router.delete("/clusters/{cluster_id}")
+async def delete_cluster(cluster_id: int):
+    if not face_clusters.remove(cluster_id):
+        raise HTTPException(status_code=404, detail=f"Cluster {cluster_id} not found")
+    return {"removed": cluster_id, "clusters": len(face_clusters)}
+
+@router.post("/clusters/search")
+async def search_clusters(query: ClusterQuery):
+    if len(query.embedding) != face_clusters.dim:
+        raise HTTPException(status_code=400, detail=f"Expected {face_clusters.dim}-d embedding")
+    return await run_in_threadpool(face_clusters.search, query.embedding, query.k, query.min_score)
@@ -1,10 +1,164 @@
-from fastapi import APIRouter, UploadFile, File
-from app.services.face_detection_service import detect_face
+import asyncio
+import time
+import cv2
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.profiles import PROFILES
+from app.core.metrics import frames_dropped_total
+from app.services.face_detection_service import detect_face, stream_sessions, static_cache_context
+from app.services.result_cache import static_results
+from app.services.face_clusters import cluster_faces
+from app.services.inference_executor import inference_executor, QueueFullError
+from app.services.frame_slot import LatestFrameSlot
+from app.api.v1.responses import render, encode_message
 
 router = APIRouter()
 
+def check_profile(profile: Optional[str]):
+    if profile is not None and profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile '{profile}'. Available: {', '.join(PROFILES)}")
+
+async def analyze_static(image_bytes, profile=None):
+    """
+    Static analysis through the content-addressed result cache; hits never
+    reach the inference pool. Raises QueueFullError like inference_executor.run.
+    """
+    if not static_results.enabled:
+        return await inference_executor.run(detect_face, image_bytes, is_static=True, profile=profile)
+    started = time.perf_counter()
+    key = static_results.key(image_bytes, static_cache_context(profile))
+    result = static_results.get(key)
+    if result is not None:
+        elapsed = round((time.perf_counter() - started) * 1000, 3)
+        return result, {"queueMs": 0.0, "computeMs": elapsed, "totalMs": elapsed, "cached": True}
+    result, timing = await inference_executor.run(detect_face, image_bytes, is_static=True, profile=profile)
+    # Empty results may come from a transient failure, so they are recomputed next time
+    if result["faceDetected"]:
+        static_results.put(key, result)
+    return result, timing
+
+async def annotate_clusters(result, stream_id=None, learn=True):
+    """
+    Adds `clusterId` to the faces of a result (see cluster_faces). Clustering
+    runs here, next to the gallery, so every pool process feeds one set of clusters.
+    Motion-skipped frames repeat faces that were never re-analysed, so they only look up.
+    """
+    learn = learn and not result.get("skipped")
+    if settings.cluster_enabled and result["faces"]:
+        await run_in_threadpool(cluster_faces, result["faces"], stream_id, learn)
+
 @router.post("/detect")
-async def detect(file: UploadFile = File(...), is_static: bool = False):
+async def detect(request: Request, file: UploadFile = File(...), is_static: bool = False,
+                 stream_id: str = "default", profile: Optional[str] = None, format: str = "json"):
+    check_profile(profile)
     image_bytes = await file.read()
-    result = detect_face(image_bytes, is_static=is_static)
-    return {"result": result}
\ No newline at end of file
+    try:
+        if is_static:
+            result, timing = await analyze_static(image_bytes, profile=profile)
+        else:
+            result, timing = await inference_executor.run_local(
+                detect_face, image_bytes, is_static=False, stream_id=stream_id, profile=profile
+            )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    # A cached static result is a repeat lookup, not a new sighting
+    await annotate_clusters(result, None if is_static else stream_id, learn=not timing.get("cached"))
+    return render({"result": result, "timing": timing}, request, format)
+
+@router.get("/profiles")
+async def list_profiles():
+    return PROFILES
+
+@router.get("/cache/static")
+async def static_cache_stats():
+    return static_results.stats()
+
+@router.delete("/cache/static")
+async def clear_static_cache():
+    """
+    Invalidation hook for model or threshold changes the cache key cannot see
+    (e.g. model files replaced on disk).
+    """
+    removed = static_results.invalidate()
+    return dict(static_results.stats(), removedFromDisk=removed)
+
+@router.get("/streams")
+async def list_streams():
+    return stream_sessions.stats()
+
+@router.delete("/streams/{stream_id}")
+async def close_stream(stream_id: str):
+    if not stream_sessions.close(stream_id):
+        raise HTTPException(status_code=404, detail=f"Stream '{stream_id}' has no live session")
+    return {"closed": stream_id}
+
+@router.get("/streams/{stream_id}/tracks/{track_id}/best-crop")
+async def best_crop(stream_id: str, track_id: int):
+    """
+    Highest-quality face crop seen so far for a live track, as JPEG.
+    """
+    session = stream_sessions.find(stream_id)
+    best = session.best_crops.get(track_id) if session is not None else None
+    if best is None:
+        raise HTTPException(status_code=404, detail=f"No crop for track {track_id} on stream '{stream_id}'")
+    quality, crop = best
+    ok, jpeg = cv2.imencode(".jpg", crop)
+    if not ok:
+        raise HTTPException(status_code=500, detail="Could not encode crop")
+    return Response(content=jpeg.tobytes(), media_type="image/jpeg", headers={"X-Face-Quality": f"{quality:.4f}"})
+
+@router.websocket("/streams/{stream_id}/ws")
+async def stream_socket(websocket: WebSocket, stream_id: str, profile: Optional[str] = None, format: str = "json"):
+    """
+    Live ingest: the client pushes raw JPEG frames as binary messages and gets
+    one result message per processed frame. When inference falls behind, only
+    the newest waiting frame is kept; `seq` is the frame's position in the
+    client's stream and `dropped` counts frames skipped so far.
+    """
+    if profile is not None and profile not in PROFILES:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    slot = LatestFrameSlot()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    slot.put(message["bytes"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            taken = await slot.take()
+            if taken is None:
+                break
+            seq, image_bytes = taken
+            try:
+                result, timing = await inference_executor.run_local(
+                    detect_face, image_bytes, is_static=False, stream_id=stream_id, profile=profile
+                )
+            except QueueFullError:
+                # Other clients hold the pool; this frame is skipped like any stale one
+                slot.dropped += 1
+                frames_dropped_total.inc(reason="queue_full")
+                continue
+            await annotate_clusters(result, stream_id)
+            message = encode_message({"seq": seq, "dropped": slot.dropped, "result": result, "timing": timing}, format)
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
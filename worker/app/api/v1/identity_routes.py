@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+import numpy as np
+from app.core.metrics import stage_seconds
+from app.services.gallery_service import gallery
+from app.services.inference_executor import QueueFullError
+from app.api.v1.responses import render
+from app.api.v1.face_routes import check_profile, analyze_static, annotate_clusters
+
+router = APIRouter()
+
+class GalleryEntry(BaseModel):
+    embedding: List[float]
+    metadata: Optional[Dict] = None
+
+class GalleryBulkEntry(GalleryEntry):
+    id: str
+
+class GalleryBulkRequest(BaseModel):
+    items: List[GalleryBulkEntry]
+
+@router.get("/gallery")
+async def gallery_stats():
+    return gallery.stats()
+
+@router.put("/gallery/{identity_id}")
+async def upsert_identity(identity_id: str, entry: GalleryEntry):
+    try:
+        await run_in_threadpool(gallery.upsert, identity_id, entry.embedding, entry.metadata)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"upserted": identity_id, "size": len(gallery)}
+
+@router.post("/gallery/bulk")
+async def upsert_identities(request: GalleryBulkRequest):
+    items = [(item.id, item.embedding, item.metadata) for item in request.items]
+    try:
+        count = await run_in_threadpool(gallery.upsert_many, items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"upserted": count, "size": len(gallery)}
+
+@router.delete("/gallery/{identity_id}")
+async def remove_identity(identity_id: str):
+    if not await run_in_threadpool(gallery.remove, identity_id):
+        raise HTTPException(status_code=404, detail=f"Identity '{identity_id}' is not in the gallery")
+    return {"removed": identity_id, "size": len(gallery)}
+
+@router.post("/identify")
+async def identify(request: Request, file: UploadFile = File(...), k: int = Query(5, ge=1, le=100),
+                   min_score: Optional[float] = Query(None, ge=-1.0, le=1.0), profile: Optional[str] = None, format: str = "json"):
+    """
+    Detects every face in the image and returns its top-k gallery matches in one call.
+    """
+    check_profile(profile)
+    image_bytes = await file.read()
+    try:
+        result, timing = await analyze_static(image_bytes, profile=profile)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    faces = [face for face in result["faces"] if face["embedding"] is not None and len(face["embedding"])]
+    if faces:
+        # The gallery lives in this process, so search here rather than in the pool
+        queries = np.stack([face["embedding"] for face in faces])
+        with stage_seconds.time(stage="gallery_search"):
+            matches = await run_in_threadpool(gallery.search, queries, k, min_score)
+        for face, face_matches in zip(faces, matches):
+            face["matches"] = face_matches
+
+    # Identification looks clusters up without adding to them
+    await annotate_clusters(result, learn=False)
+    return render({"result": result, "timing": timing}, request, format)
@@ -0,0 +1,23 @@
+from fastapi import Request, Response
+from app.core.metrics import stage_seconds
+from app.utils.serialization import to_jsonable, encode_binary, BINARY_MEDIA_TYPE
+
+def render(payload, request: Request, format: str = "json"):
+    """
+    JSON by default; the packed binary layout when asked for via `format` or Accept.
+    """
+    accept = request.headers.get("accept", "")
+    with stage_seconds.time(stage="serialize"):
+        if format in ("binary", "binary16") or BINARY_MEDIA_TYPE in accept:
+            dtype = "float16" if format == "binary16" else "float32"
+            return Response(content=encode_binary(payload, dtype=dtype), media_type=BINARY_MEDIA_TYPE)
+        return to_jsonable(payload)
+
+def encode_message(payload, format: str = "json"):
+    """
+    WebSocket counterpart of render: packed binary bytes or a JSON-ready dict.
+    """
+    with stage_seconds.time(stage="serialize"):
+        if format in ("binary", "binary16"):
+            return encode_binary(payload, dtype="float16" if format == "binary16" else "float32")
+        return to_jsonable(payload)
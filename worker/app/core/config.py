@@ -0,0 +1,103 @@
+import os
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+class Settings:
+    """
+    Worker runtime settings, resolved once from environment variables.
+    """
+    def __init__(self):
+        # Execution layer: "thread" or "process"
+        self.inference_mode = os.getenv("INFERENCE_MODE", "thread").lower()
+        self.inference_workers = _env_int("INFERENCE_WORKERS", 2)
+        # Requests allowed to wait for a free worker before we answer 503
+        self.inference_max_queue = _env_int("INFERENCE_MAX_QUEUE", 8)
+
+        # Micro-batching across concurrent requests (0 ms window disables it)
+        self.batch_window_ms = _env_int("BATCH_WINDOW_MS", 0)
+        self.batch_max_size = _env_int("BATCH_MAX_SIZE", 8)
+
+        # Live tracking sessions (one per stream_id)
+        self.stream_idle_timeout = _env_int("STREAM_IDLE_TIMEOUT", 300)
+        self.max_stream_sessions = _env_int("MAX_STREAM_SESSIONS", 64)
+
+        # Identification gallery; empty GALLERY_DIR keeps it in memory only
+        self.gallery_dir = os.getenv("GALLERY_DIR", "")
+        self.gallery_dtype = os.getenv("GALLERY_DTYPE", "float32")
+        self.gallery_ann_threshold = _env_int("GALLERY_ANN_THRESHOLD", 50000)
+
+        # ONNX Runtime sessions (0 intra-op threads: cores / INFERENCE_WORKERS)
+        self.ort_intra_op_threads = _env_int("ORT_INTRA_OP_THREADS", 0)
+        self.ort_inter_op_threads = _env_int("ORT_INTER_OP_THREADS", 1)
+        self.ort_graph_optimization = os.getenv("ORT_GRAPH_OPTIMIZATION", "all").lower()
+        self.ort_mem_arena = os.getenv("ORT_MEM_ARENA", "1") not in ("0", "false", "no")
+        # Weight variants: fp32, fp16 or int8 (see scripts/quantize_models.py)
+        self.det_precision = os.getenv("DET_PRECISION", "fp32").lower()
+        self.rec_precision = os.getenv("REC_PRECISION", "fp32").lower()
+
+        # Model loading: "background" (warm up after startup), "eager" (before
+        # serving; pair with gunicorn --preload to share weights copy-on-write) or "lazy"
+        self.model_warmup = os.getenv("MODEL_WARMUP", "background").lower()
+
+        # Default model tiers (see app/core/profiles.py)
+        self.live_profile = os.getenv("LIVE_PROFILE", "live")
+        self.static_profile = os.getenv("STATIC_PROFILE", "balanced")
+
+        # Offline video jobs read files under this directory (empty: video jobs disabled)
+        self.video_dir = os.getenv("VIDEO_DIR", "")
+        # Video jobs running at once; they bypass the inference pool, so more would starve live streams
+        self.video_max_jobs = _env_int("VIDEO_MAX_JOBS", 1)
+
+        # Reduced-scale JPEG decode never goes below this long side (px)
+        self.decode_min_side = _env_int("DECODE_MIN_SIDE", 640)
+
+        # ROI re-detection between keyframes
+        self.roi_det_size = _env_int("ROI_DET_SIZE", 160)
+        self.roi_max_tracks = _env_int("ROI_MAX_TRACKS", 8)
+
+        # Per-track recognition cache: max age of a cached embedding (0 disables the cache)
+        self.recognition_refresh_ms = _env_int("RECOGNITION_REFRESH_MS", 2000)
+
+        # Motion gate for live streams: unchanged frames reuse the last result
+        # (MOTION_MAX_SKIP 0 disables it; at most that many frames are skipped in a row)
+        self.motion_max_skip = _env_int("MOTION_MAX_SKIP", 0)
+        self.motion_thumb_side = _env_int("MOTION_THUMB_SIDE", 160)
+        self.motion_pixel_delta = _env_int("MOTION_PIXEL_DELTA", 15)
+        self.motion_min_changed = _env_int("MOTION_MIN_CHANGED", 2)
+
+        # Static results cache (0 MB disables it); RESULT_CACHE_DIR spills evicted entries to disk
+        self.result_cache_mb = _env_int("RESULT_CACHE_MB", 64)
+        self.result_cache_dir = os.getenv("RESULT_CACHE_DIR", "")
+        self.result_cache_disk_mb = _env_int("RESULT_CACHE_DISK_MB", 1024)
+
+        # Online clustering of unknown faces (faces without a gallery match)
+        self.cluster_enabled = os.getenv("CLUSTER_ENABLED", "1") not in ("0", "false", "no")
+        self.cluster_threshold = _env_float("CLUSTER_THRESHOLD", 0.45)
+        self.cluster_merge_threshold = _env_float("CLUSTER_MERGE_THRESHOLD", 0.6)
+        self.cluster_min_quality = _env_float("CLUSTER_MIN_QUALITY", 0.4)
+        self.cluster_known_score = _env_float("CLUSTER_KNOWN_SCORE", 0.5)
+        self.cluster_max = _env_int("CLUSTER_MAX", 100000)
+        self.cluster_ann_threshold = _env_int("CLUSTER_ANN_THRESHOLD", 4096)
+
+        # Optional emotion stage: one MediaPipe landmarker pass per frame
+        self.emotion_enabled = os.getenv("EMOTION_ENABLED", "0") not in ("0", "false", "no")
+        self.emotion_model = os.getenv("EMOTION_MODEL", "face_landmarker.task")
+        self.emotion_max_faces = _env_int("EMOTION_MAX_FACES", 10)
+
+
+settings = Settings()
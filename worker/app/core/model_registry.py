@@ -0,0 +1,108 @@
+import gc
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Lazily constructed, process-wide engine singletons.
+        Each component is built on first get() (or by warm-up) under its own
+        lock, and its load time is recorded for the readiness endpoint.
+        """
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._state = {}
+        self._seconds = {}
+        self._errors = {}
+        self._required = []
+        self._warmup_thread = None
+        self._reset_listeners = []
+
+    def register(self, name, factory, required=True):
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        self._state[name] = "registered"
+        if required:
+            self._required.append(name)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                self._state[name] = "loading"
+                started = time.perf_counter()
+                try:
+                    instance = self._factories[name]()
+                except Exception as e:
+                    self._state[name] = "failed"
+                    self._errors[name] = str(e)
+                    raise
+                self._seconds[name] = round(time.perf_counter() - started, 3)
+                self._instances[name] = instance
+                self._state[name] = "ready"
+                self._errors.pop(name, None)
+        return instance
+
+    def reset(self, name):
+        """
+        Drops a loaded instance so the next get() rebuilds it.
+        """
+        with self._locks[name]:
+            self._instances.pop(name, None)
+            self._state[name] = "registered"
+        for listener in self._reset_listeners:
+            listener(name)
+
+    def on_reset(self, listener):
+        """
+        Calls `listener(name)` whenever a component is reset, so anything
+        derived from the old model (cached results) can be dropped.
+        """
+        self._reset_listeners.append(listener)
+
+    def warm_up(self, names=None, freeze=False):
+        """
+        Loads components now. With `freeze`, the loaded objects are moved out of
+        the GC's reach so forked workers keep sharing their pages copy-on-write.
+        """
+        for name in names or self._required:
+            try:
+                self.get(name)
+            except Exception:
+                logger.exception("Model warm-up failed for %s", name)
+        if freeze:
+            gc.collect()
+            gc.freeze()
+
+    def start_background_warm_up(self):
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=self.warm_up, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def is_ready(self):
+        return all(self._state[name] == "ready" for name in self._required)
+
+    def status(self):
+        return {
+            "ready": self.is_ready(),
+            "components": {
+                name: {
+                    "state": self._state[name],
+                    "loadSeconds": self._seconds.get(name),
+                    "error": self._errors.get(name)
+                }
+                for name in self._factories
+            }
+        }
+
+
+model_registry = ModelRegistry()
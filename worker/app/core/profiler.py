@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+def _collapse(frame):
+    # Root-first "file:function;..." stacks, the collapsed format flame graph tools read
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=0.005):
+        """
+        Samples one thread's Python stack every `interval` seconds from a
+        helper thread until stopped. Cheap enough to leave on for a single
+        slow request; the sampled thread is never paused.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[_collapse(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def sample_call(fn, args, kwargs, interval):
+    """
+    Runs fn on the current thread under a StackSampler.
+    Returns (result, {collapsed stack: sample count}).
+    """
+    with StackSampler(threading.get_ident(), interval) as sampler:
+        result = fn(*args, **kwargs)
+    return result, dict(sampler.samples.most_common())
+
+
+class RequestProfiler:
+    def __init__(self, keep=20):
+        """
+        Runtime switch for sampling inference calls. While enabled, every call
+        through the inference executor is sampled and those slower than
+        `threshold_ms` are kept (newest `keep`) for GET /debug/profiler.
+        """
+        self.enabled = False
+        self.threshold_ms = 250.0
+        self.interval_ms = 5.0
+        self.profiles = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=None, threshold_ms=None, interval_ms=None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = bool(enabled)
+            if threshold_ms is not None:
+                self.threshold_ms = max(0.0, float(threshold_ms))
+            if interval_ms is not None:
+                self.interval_ms = max(1.0, float(interval_ms))
+
+    def record(self, name, timing, stacks):
+        if timing["computeMs"] < self.threshold_ms:
+            return
+        with self._lock:
+            self.profiles.append({
+                "call": name,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "timing": timing,
+                "samples": sum(stacks.values()),
+                "stacks": stacks
+            })
+
+    def clear(self):
+        with self._lock:
+            self.profiles.clear()
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "thresholdMs": self.threshold_ms,
+                "intervalMs": self.interval_ms,
+                "profiles": list(self.profiles)
+            }
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,63 @@
+import math
+
+# Model tiers selectable per request / per stream.
+# det_size_min/max bound the square detector input; within those bounds the
+# input follows the frame's long side so small frames are never upscaled.
+# keyframe_interval > 1 runs the full detector only every N stream frames and
+# re-detects tracked faces inside their predicted ROI in between.
+# min_quality gates recognition: faces scoring below it (size, blur, pose,
+# detector score; see app/utils/face_quality.py) are not embedded.
+PROFILES = {
+    "live": {
+        "model": "buffalo_s",
+        "det_size_min": 160,
+        "det_size_max": 320,
+        "det_thresh": 0.3,
+        "keyframe_interval": 5,
+        "min_quality": 0.35
+    },
+    "balanced": {
+        "model": "buffalo_s",
+        "det_size_min": 640,
+        "det_size_max": 640,
+        "det_thresh": 0.15,
+        "keyframe_interval": 1,
+        "min_quality": 0.25
+    },
+    "forensic": {
+        "model": "buffalo_l",
+        "det_size_min": 320,
+        "det_size_max": 1024,
+        "det_thresh": 0.15,
+        "keyframe_interval": 1,
+        "min_quality": 0.0
+    }
+}
+
+# Detector inputs are snapped to this grid so only a handful of shapes exist
+DET_SIZE_STEP = 160
+
+# Lowest threshold any profile uses; engines are prepared with it and each
+# profile filters its own detections afterwards
+MIN_DET_THRESH = min(p["det_thresh"] for p in PROFILES.values())
+
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}'. Available: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def detection_size(profile, frame_shape):
+    """
+    Square detector input for a frame: the long side rounded up to the grid,
+    clamped to the profile's bounds.
+    """
+    long_side = max(frame_shape[0], frame_shape[1])
+    side = int(math.ceil(long_side / DET_SIZE_STEP) * DET_SIZE_STEP)
+    side = max(profile["det_size_min"], min(profile["det_size_max"], side))
+    return (side, side)
+
+
+def model_packs():
+    return sorted({p["model"] for p in PROFILES.values()})
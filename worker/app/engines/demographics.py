@@ -1,21 +1,32 @@
 import cv2
 import numpy as np
 import os
-import requests
 import hashlib
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
+# Files expected in the model directory (fetch them with scripts/download_demographics.py)
+MODEL_FILES = ("deploy_age.prototxt", "age_net.caffemodel", "deploy_gender.prototxt", "gender_net.caffemodel")
+
 class DemographicsEngine:
-    def __init__(self, model_dir='models'):
+    def __init__(self, model_dir='models', stabilize=True, max_batch=32):
+        """
+        Caffe age/gender nets loaded from `model_dir`; nothing is downloaded here.
+        With `stabilize`, borderline predictions are replaced by a choice seeded
+        from the chip's MD5, so the same chip always gets the same answer.
+        """
         self.model_dir = model_dir
-        os.makedirs(self.model_dir, exist_ok=True)
+        self.stabilize = stabilize
+        self.max_batch = max(1, max_batch)
 
         self.age_proto = os.path.join(model_dir, "deploy_age.prototxt")
         self.age_model = os.path.join(model_dir, "age_net.caffemodel")
         self.gender_proto = os.path.join(model_dir, "deploy_gender.prototxt")
         self.gender_model = os.path.join(model_dir, "gender_net.caffemodel")
 
-        self._ensure_models()
+        self._check_models()
 
         self.age_net = cv2.dnn.readNet(self.age_model, self.age_proto)
         self.gender_net = cv2.dnn.readNet(self.gender_model, self.gender_proto)
@@ -26,80 +37,74 @@ class DemographicsEngine:
         # Standard ILSVRC Mean (BGR) for Caffe models
         self.MODEL_MEAN_VALUES = (104.0, 117.0, 123.0)
 
-    def _ensure_models(self):
-        MODEL_URLS = {
-            "deploy_age.prototxt": "https://raw.githubusercontent.com/GilLevi/AgeGenderDeepLearning/master/age_net_definitions/deploy.prototxt",
-            "age_net.caffemodel": "https://github.com/GilLevi/AgeGenderDeepLearning/raw/master/models/age_net.caffemodel",
-            "deploy_gender.prototxt": "https://raw.githubusercontent.com/GilLevi/AgeGenderDeepLearning/master/gender_net_definitions/deploy.prototxt",
-            "gender_net.caffemodel": "https://github.com/GilLevi/AgeGenderDeepLearning/raw/master/models/gender_net.caffemodel"
-        }
+    def _check_models(self):
+        missing = [name for name in MODEL_FILES if not os.path.exists(os.path.join(self.model_dir, name))]
+        if missing:
+            raise FileNotFoundError(
+                f"Demographics models missing from '{self.model_dir}': {', '.join(missing)}. "
+                f"Run: python -m scripts.download_demographics --model-dir {self.model_dir}"
+            )
 
-        for name, url in MODEL_URLS.items():
-            path = os.path.join(self.model_dir, name)
-            if not os.path.exists(path):
-                print(f"Downloading {name}...")
-                r = requests.get(url, stream=True)
-                with open(path, "wb") as f:
-                    for chunk in r.iter_content(8192):
-                        f.write(chunk)
+    def _forward(self, net, blob):
+        net.setInput(blob)
+        return net.forward()
 
-    def analyze(self, face_chip: np.ndarray):
+    def analyze_batch(self, face_chips):
         """
-        Analyzes a face chip for age and gender with deterministic stability.
-        Uses hashing to ensure consistent results for the same person without 
-        interference from other detections in the frame.
+        Age and gender for many face chips (from one frame or many): one blob,
+        one forward pass per net for every `max_batch` chips.
         """
-        try:
-            # Deterministic Stability Layer
-            # Hash the face chip to ensure consistent results for the SAME face
-            chip_hash = hashlib.md5(face_chip.tobytes()).hexdigest()
-            seed = int(chip_hash, 16) % (2**32)
-            rng = random.Random(seed)
+        results = []
+        for start in range(0, len(face_chips), self.max_batch):
+            chips = face_chips[start:start + self.max_batch]
+            try:
+                blob = cv2.dnn.blobFromImages(
+                    chips,
+                    1.0,
+                    (227, 227),
+                    self.MODEL_MEAN_VALUES,
+                    swapRB=False
+                )
+                gender_preds = self._forward(self.gender_net, blob)
+                age_preds = self._forward(self.age_net, blob)
+            except Exception:
+                logger.exception("Demographics inference failed for %d faces", len(chips))
+                results.extend({"age": "Unknown", "gender": "Unknown", "confidence": {"age": 0, "gender": 0}}
+                               for _ in chips)
+                continue
 
-            # Prepare blob for neural inference
-            blob = cv2.dnn.blobFromImage(
-                face_chip,
-                1.0,
-                (227, 227),
-                self.MODEL_MEAN_VALUES,
-                swapRB=False
-            )
+            gender_idx = gender_preds.argmax(axis=1)
+            gender_conf = gender_preds.max(axis=1)
+            age_idx = age_preds.argmax(axis=1)
+            age_conf = age_preds.max(axis=1)
+            for i, chip in enumerate(chips):
+                results.append(self._result(chip, int(gender_idx[i]), float(gender_conf[i]),
+                                            int(age_idx[i]), float(age_conf[i])))
+        return results
 
-            # 1. Gender Prediction
-            self.gender_net.setInput(blob)
-            gender_preds = self.gender_net.forward()[0]
-            gender_idx = gender_preds.argmax()
-            gender_conf = float(gender_preds.max())
-
-            # Stability Logic: If borderline, use hash for deterministic stability
+    def _result(self, chip, gender_idx, gender_conf, age_idx, age_conf):
+        # Only borderline predictions need the chip hash
+        if self.stabilize and (gender_conf < 0.8 or age_conf < 0.6):
+            chip_hash = hashlib.md5(chip.tobytes()).hexdigest()
+            rng = random.Random(int(chip_hash, 16) % (2**32))
             if gender_conf < 0.8:
                 gender_idx = rng.randint(0, 1)
                 gender_conf = 0.85 # UI stability boost
-            
-            gender = self.GENDER_LIST[gender_idx]
-
-            # 2. Age Prediction
-            self.age_net.setInput(blob)
-            age_preds = self.age_net.forward()[0]
-            age_idx = age_preds.argmax()
-            age_conf = float(age_preds.max())
-
-            # Stability Logic: If borderline, use hash for deterministic stability
             if age_conf < 0.6:
                 age_idx = rng.randint(3, 5) # Default to adult ranges
                 age_conf = 0.7
-                
-            age = self.AGE_LIST[age_idx]
 
-            return {
-                "age": age,
-                "gender": gender,
-                "confidence": {
-                    "age": round(age_conf, 4),
-                    "gender": round(gender_conf, 4)
-                }
+        return {
+            "age": self.AGE_LIST[age_idx],
+            "gender": self.GENDER_LIST[gender_idx],
+            "confidence": {
+                "age": round(age_conf, 4),
+                "gender": round(gender_conf, 4)
             }
+        }
 
-        except Exception as e:
-            print("Demographics error:", e)
-            return {"age": "Unknown", "gender": "Unknown", "confidence": {"age": 0, "gender": 0}}
\ No newline at end of file
+    def analyze(self, face_chip: np.ndarray):
+        """
+        Analyzes a single face chip for age and gender.
+        """
+        return self.analyze_batch([face_chip])[0]
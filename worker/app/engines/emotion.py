@@ -1,57 +1,142 @@
+import threading
+import time
 import cv2
 import numpy as np
 import mediapipe as mpt
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
+from app.utils.association import associate
+
+EMOTIONS = ["Neutral", "Happy", "Sad", "Anger", "Surprise", "Fear", "Disgust"]
+
+# Heuristic FACS mapping: each emotion is a constant plus a weighted sum of blendshapes
+EMOTION_BIAS = {"Neutral": 0.5}
+EMOTION_WEIGHTS = {
+    "Happy": {"mouthSmileLeft": 0.5, "mouthSmileRight": 0.5, "cheekPuff": 0.5},
+    "Sad": {"mouthFrownLeft": 0.5, "mouthFrownRight": 0.5, "browDownLeft": 0.3},
+    "Anger": {"browDownLeft": 0.5, "browDownRight": 0.5, "mouthPucker": 0.5, "eyeSquintLeft": 0.2},
+    "Surprise": {"eyeWideLeft": 0.5, "eyeWideRight": 0.5, "browInnerUp": 0.7, "jawOpen": 0.5},
+    "Fear": {"eyeWideLeft": 0.5, "eyeWideRight": 0.5, "browInnerUp": 0.4, "mouthPucker": 0.3},
+    "Disgust": {"noseSneerLeft": 0.5, "noseSneerRight": 0.5, "mouthUpperUpLeft": 0.5},
+}
+
+# Landmark hull vs. detector box; the mesh sits a little inside the SCRFD box
+MATCH_IOU = 0.3
+
+
+def no_emotion():
+    return {"scores": {e: 0.0 for e in EMOTIONS}, "dominant": "Neutral"}
+
+
+class StreamLandmarker:
+    def __init__(self, landmarker):
+        """
+        VIDEO-mode landmarker owned by one stream, so MediaPipe tracks faces
+        between its frames instead of re-detecting them. Timestamps must grow
+        strictly, so calls are serialised by the stream's session lock.
+        """
+        self.landmarker = landmarker
+        self.last_ms = -1
+
+    def detect(self, mp_image):
+        timestamp_ms = max(self.last_ms + 1, int(time.monotonic() * 1000))
+        self.last_ms = timestamp_ms
+        return self.landmarker.detect_for_video(mp_image, timestamp_ms)
+
+    def close(self):
+        # Releases the native graph and its threads now rather than at GC
+        self.landmarker.close()
+
 
 class EmotionEngine:
-    def __init__(self, model_path: str = 'face_landmarker.task'):
-        base_options = python.BaseOptions(model_asset_path=model_path)
-        options = vision.FaceLandmarkerOptions(
-            base_options=base_options,
+    def __init__(self, model_path: str = 'face_landmarker.task', max_faces: int = 10):
+        self.model_path = model_path
+        self.max_faces = max_faces
+        # Still images share one IMAGE-mode landmarker
+        self.landmarker = vision.FaceLandmarker.create_from_options(self._options(vision.RunningMode.IMAGE))
+        self._lock = threading.Lock()
+        self.emotions = EMOTIONS
+
+        self._names = None
+        self._weights = None
+        self._bias = np.array([EMOTION_BIAS.get(e, 0.0) for e in EMOTIONS], dtype=np.float32)
+
+    def _options(self, running_mode):
+        return vision.FaceLandmarkerOptions(
+            base_options=python.BaseOptions(model_asset_path=self.model_path),
+            running_mode=running_mode,
             output_face_blendshapes=True,
-            output_facial_transformation_matrixes=True,
-            num_faces=5
+            num_faces=self.max_faces
         )
-        self.landmarker = vision.FaceLandmarker.create_from_options(options)
-        self.emotions = ["Neutral", "Happy", "Sad", "Anger", "Surprise", "Fear", "Disgust"]
 
-    def detect_emotion(self, face_chip: np.ndarray):
+    def stream_landmarker(self):
+        return StreamLandmarker(vision.FaceLandmarker.create_from_options(self._options(vision.RunningMode.VIDEO)))
+
+    def _weight_matrix(self, names):
+        # (blendshapes x emotions), built once for the model's blendshape order
+        if names != self._names:
+            column = {name: i for i, name in enumerate(names)}
+            weights = np.zeros((len(names), len(EMOTIONS)), dtype=np.float32)
+            for j, emotion in enumerate(EMOTIONS):
+                for name, weight in EMOTION_WEIGHTS.get(emotion, {}).items():
+                    if name in column:
+                        weights[column[name], j] = weight
+            self._names, self._weights = names, weights
+        return self._weights
+
+    def score(self, blendshapes):
         """
-        Analyzes a face chip using MediaPipe Blendshapes and maps them to emotions.
+        Emotion distributions for all faces of a landmarker result at once.
         """
-        # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(face_chip, cv2.COLOR_BGR2RGB)
-        mp_image = mpt.Image(image_format=mpt.ImageFormat.SRGB, data=image_rgb)
-        
-        # Run Landmarker
-        result = self.landmarker.detect(mp_image)
-        
+        names = tuple(c.category_name for c in blendshapes[0])
+        values = np.array([[c.score for c in face] for face in blendshapes], dtype=np.float32)
+        scores = values @ self._weight_matrix(names) + self._bias
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def analyze(self, img_bgr: np.ndarray, boxes, landmarker=None, iou_threshold=MATCH_IOU):
+        """
+        One landmarker pass over the whole frame, mapped onto `boxes`
+        ([x1, y1, x2, y2] in `img_bgr` pixels) by overlap with each mesh's
+        extent. Returns one {"scores", "dominant"} per box; boxes without a
+        matching mesh get zero scores. `landmarker` is a StreamLandmarker for
+        live streams; None uses the shared IMAGE-mode one.
+        """
+        if not len(boxes):
+            return []
+        height, width = img_bgr.shape[:2]
+        mp_image = mpt.Image(image_format=mpt.ImageFormat.SRGB, data=cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB))
+        if landmarker is not None:
+            result = landmarker.detect(mp_image)
+        else:
+            with self._lock:
+                result = self.landmarker.detect(mp_image)
+
         if not result.face_blendshapes:
-            return {"scores": {e: 0.0 for e in self.emotions}, "dominant": "Neutral"}
-
-        # Extract blendshapes into a dict for easy access
-        # Each face_blendshape is a list of Category objects with category_name and score
-        blendshapes = {b.category_name: b.score for b in result.face_blendshapes[0]}
-
-        # Map blendshapes to emotions (Heuristic mapping based on FACS)
-        scores = {
-            "Neutral": 0.5, # Base score
-            "Happy": (blendshapes.get('mouthSmileLeft', 0) + blendshapes.get('mouthSmileRight', 0)) / 2 + blendshapes.get('cheekPuff', 0) * 0.5,
-            "Sad": (blendshapes.get('mouthFrownLeft', 0) + blendshapes.get('mouthFrownRight', 0)) / 2 + blendshapes.get('browDownLeft', 0) * 0.3,
-            "Anger": (blendshapes.get('browDownLeft', 0) + blendshapes.get('browDownRight', 0)) / 2 + blendshapes.get('mouthPucker', 0) * 0.5 + blendshapes.get('eyeSquintLeft', 0) * 0.2,
-            "Surprise": (blendshapes.get('eyeWideLeft', 0) + blendshapes.get('eyeWideRight', 0)) / 2 + blendshapes.get('browInnerUp', 0) * 0.7 + blendshapes.get('jawOpen', 0) * 0.5,
-            "Fear": (blendshapes.get('eyeWideLeft', 0) + blendshapes.get('eyeWideRight', 0)) / 2 + blendshapes.get('browInnerUp', 0) * 0.4 + blendshapes.get('mouthPucker', 0) * 0.3,
-            "Disgust": (blendshapes.get('noseSneerLeft', 0) + blendshapes.get('noseSneerRight', 0)) / 2 + blendshapes.get('mouthUpperUpLeft', 0) * 0.5,
-        }
-
-        # Normalize scores (softmax-like or simple normalization)
-        total = sum(scores.values())
-        normalized_scores = {k: round(v / total, 4) for k, v in scores.items()}
-        
-        dominant = max(normalized_scores, key=normalized_scores.get)
-        
-        return {
-            "scores": normalized_scores,
-            "dominant": dominant
-        }
+            return [no_emotion() for _ in boxes]
+
+        mesh_boxes = []
+        for landmarks in result.face_landmarks:
+            points = np.array([(p.x, p.y) for p in landmarks], dtype=np.float32) * (width, height)
+            mesh_boxes.append([*points.min(axis=0), *points.max(axis=0)])
+        mesh_of, _ = associate(boxes, mesh_boxes, iou_threshold=iou_threshold)
+
+        scores = self.score(result.face_blendshapes)
+        dominant = scores.argmax(axis=1)
+        emotions = []
+        for mesh in mesh_of:
+            if mesh < 0:
+                emotions.append(no_emotion())
+                continue
+            emotions.append({
+                "scores": {e: round(float(s), 4) for e, s in zip(EMOTIONS, scores[mesh])},
+                "dominant": EMOTIONS[dominant[mesh]]
+            })
+        return emotions
+
+    def detect_emotion(self, face_chip: np.ndarray):
+        """
+        Analyzes a single face chip: the chip is the face box, and any
+        overlapping mesh counts.
+        """
+        height, width = face_chip.shape[:2]
+        return self.analyze(face_chip, [[0, 0, width, height]], iou_threshold=0.0)[0]
@@ -2,59 +2,257 @@ import cv2
 import numpy as np
 import insightface
 from insightface.app import FaceAnalysis
+from insightface.utils import face_align
+from insightface.model_zoo.retinaface import distance2bbox, distance2kps
 import os
+from app.core.config import settings
+from app.engines.onnx_sessions import rebuild_session
+from app.utils.image_decode import BufferPool
 
 class InsightFaceEngine:
-    def __init__(self, model_name='buffalo_l', ctx_id=-1, det_size=(640, 640)):
+    def __init__(self, model_name='buffalo_l', ctx_id=-1, det_size=(640, 640), det_thresh=0.15,
+                 det_precision=None, rec_precision=None):
         """
         Unified InsightFaceEngine for detection, recognition, and demographics.
+        One prepared model pack serves every detection size: the detector ONNX
+        graph takes dynamic input shapes, and thresholds above `det_thresh`
+        are applied per call. Sessions use the tuned ORT_* options and the
+        DET_PRECISION / REC_PRECISION weight variants unless overridden here.
         """
+        self.model_name = model_name
         self.det_size = det_size
+        self.det_thresh = det_thresh
         
         # Determine execution provider
         providers = ['CPUExecutionProvider']
         
-        self.app = FaceAnalysis(name=model_name, providers=providers)
-        self.app.prepare(ctx_id=ctx_id, det_size=self.det_size, det_thresh=0.15)
+        # The 68/106-point landmark heads are never consumed downstream, so skip loading them
+        self.app = FaceAnalysis(
+            name=model_name,
+            providers=providers,
+            allowed_modules=['detection', 'recognition', 'genderage']
+        )
+        self.app.prepare(ctx_id=ctx_id, det_size=self.det_size, det_thresh=self.det_thresh)
 
-    def analyze(self, img_bgr: np.ndarray):
+        self.det_model = self.app.det_model
+        self.rec_model = self.app.models.get('recognition')
+        self.ga_model = self.app.models.get('genderage')
+
+        # InsightFace builds its sessions with default options; rebuild them tuned
+        self.model_files = {}
+        for key, model, precision in (
+            ('detection', self.det_model, det_precision or settings.det_precision),
+            ('recognition', self.rec_model, rec_precision or settings.rec_precision),
+            ('genderage', self.ga_model, 'fp32')
+        ):
+            loaded = rebuild_session(model, precision, providers)
+            if loaded:
+                self.model_files[key] = os.path.basename(loaded)
+
+        # ONNX exports with a symbolic batch dimension can take stacked inputs
+        self.det_batched = self._has_dynamic_batch(self.det_model) and getattr(self.det_model, 'batched', False)
+        self.rec_batched = self._has_dynamic_batch(self.rec_model)
+        self.ga_batched = self._has_dynamic_batch(self.ga_model)
+
+        # Letterbox canvases for detection, reused across frames and batches
+        self._canvases = BufferPool()
+
+    @staticmethod
+    def _has_dynamic_batch(model):
+        if model is None:
+            return False
+        batch_dim = model.session.get_inputs()[0].shape[0]
+        return not isinstance(batch_dim, int)
+
+    def analyze(self, img_bgr: np.ndarray, det_size=None, det_thresh=None):
         """
         Processes a full frame for faces, embeddings, and demographics.
         Returns a list of face objects.
         """
-        try:
-            faces = self.app.get(img_bgr)
-        except Exception as e:
-            # Important: Log the error if possible, but for now just raise to be caught by service
-            raise e
-        
-        results = []
-        for face in faces:
-            # bbox is [x1, y1, x2, y2]
-            bbox = face.bbox.astype(int).tolist()
-            
-            # Use safe defaults for demographics
-            age = 25
-            gender = 1
-            
-            if hasattr(face, 'age') and face.age is not None:
-                try:
-                    age = int(face.age)
-                except:
-                    pass
-            
-            if hasattr(face, 'gender') and face.gender is not None:
-                try:
-                    gender = int(face.gender)
-                except:
-                    pass
-            
-            results.append({
-                "bbox": bbox,
-                "embedding": face.embedding.tolist() if face.embedding is not None else [],
-                "age": age,
-                "gender": gender,
-                "det_score": float(face.det_score) if face.det_score is not None else 0.0
-            })
-            
+        return self.analyze_batch([img_bgr], det_size=det_size, det_thresh=det_thresh)[0]
+
+    def analyze_batch(self, images, det_size=None, det_thresh=None):
+        """
+        Processes several frames at once.
+        Detection is stacked when the detector supports it; recognition and
+        genderage run once over the face crops of every frame combined.
+        Returns one list of face objects per input frame.
+        """
+        results = self.detect_batch(images, det_size=det_size, det_thresh=det_thresh)
+        self.recognize(images, [(frame_idx, face) for frame_idx, faces in enumerate(results) for face in faces])
         return results
+
+    def detect(self, img_bgr: np.ndarray, det_size=None, det_thresh=None):
+        return self.detect_batch([img_bgr], det_size=det_size, det_thresh=det_thresh)[0]
+
+    def detect_batch(self, images, det_size=None, det_thresh=None):
+        """
+        Detector only: per frame, a list of {"bbox", "kps", "det_score"}.
+        """
+        det_size = tuple(det_size or self.det_size)
+
+        if self.det_batched and len(images) > 1:
+            detections = self._detect_stacked(images, det_size)
+        else:
+            # Same letterbox/decode path one frame at a time, so fixed batch-1
+            # exports also draw their canvas from the pool
+            detections = [self._detect_stacked([img], det_size)[0] for img in images]
+
+        # NMS only lets stronger boxes suppress weaker ones, so raising the
+        # threshold after the fact matches running with it
+        if det_thresh is not None and det_thresh > self.det_thresh:
+            detections = [self._above(bboxes, kpss, det_thresh) for bboxes, kpss in detections]
+
+        return [
+            [
+                {
+                    "bbox": bboxes[i, 0:4].astype(int).tolist(),
+                    "kps": kpss[i] if kpss is not None else None,
+                    "det_score": float(bboxes[i, 4])
+                }
+                for i in range(bboxes.shape[0])
+            ]
+            for bboxes, kpss in detections
+        ]
+
+    def recognize(self, images, faces):
+        """
+        Batched recognition + genderage for (frame_idx, face) pairs from detect_batch.
+        Adds "embedding", "age" and "gender" to each face in place.
+        """
+        if not faces:
+            return
+        embeddings = self._embed(images, faces)
+        genders, ages = self._gender_age(images, faces)
+
+        for i, (_, face) in enumerate(faces):
+            # float32 row; serialised only at the API edge
+            face["embedding"] = embeddings[i]
+            face["age"] = int(ages[i]) if ages is not None else 25
+            face["gender"] = int(genders[i]) if genders is not None else 1
+
+    @staticmethod
+    def _above(bboxes, kpss, det_thresh):
+        keep = bboxes[:, 4] >= det_thresh
+        return bboxes[keep], (kpss[keep] if kpss is not None else None)
+
+    def _detect_stacked(self, images, input_size):
+        """
+        Mirrors RetinaFace.detect, but letterboxes all frames into one blob
+        and runs a single detector session call for the whole batch. Exports
+        without a batch axis in their outputs take one frame per call.
+        """
+        det = self.det_model
+        batched = getattr(det, 'batched', False)
+        det_imgs, det_scales = [], []
+        for img in images:
+            im_ratio = float(img.shape[0]) / img.shape[1]
+            model_ratio = float(input_size[1]) / input_size[0]
+            if im_ratio > model_ratio:
+                new_height = input_size[1]
+                new_width = int(new_height / im_ratio)
+            else:
+                new_width = input_size[0]
+                new_height = int(new_width * im_ratio)
+            det_scales.append(float(new_height) / img.shape[0])
+            det_img = self._canvases.acquire((input_size[1], input_size[0], 3))
+            det_img.fill(0)
+            det_img[:new_height, :new_width, :] = cv2.resize(img, (new_width, new_height))
+            det_imgs.append(det_img)
+
+        blob = cv2.dnn.blobFromImages(
+            det_imgs, 1.0 / det.input_std, tuple(input_size),
+            (det.input_mean, det.input_mean, det.input_mean), swapRB=True
+        )
+        # blobFromImages copied the pixels, so the canvases can serve the next batch
+        self._canvases.release(det_imgs)
+        net_outs = det.session.run(det.output_names, {det.input_name: blob})
+        input_height, input_width = blob.shape[2], blob.shape[3]
+
+        outputs = []
+        for b, det_scale in enumerate(det_scales):
+            scores_list, bboxes_list, kpss_list = [], [], []
+            for idx, stride in enumerate(det._feat_stride_fpn):
+                scores = net_outs[idx][b] if batched else net_outs[idx]
+                bbox_preds = (net_outs[idx + det.fmc][b] if batched else net_outs[idx + det.fmc]) * stride
+                height, width = input_height // stride, input_width // stride
+                anchor_centers = self._anchor_centers(height, width, stride)
+
+                pos_inds = np.where(scores >= det.det_thresh)[0]
+                scores_list.append(scores[pos_inds])
+                bboxes_list.append(distance2bbox(anchor_centers, bbox_preds)[pos_inds])
+                if det.use_kps:
+                    kps_preds = (net_outs[idx + det.fmc * 2][b] if batched else net_outs[idx + det.fmc * 2]) * stride
+                    kpss = distance2kps(anchor_centers, kps_preds)
+                    kpss_list.append(kpss.reshape((kpss.shape[0], -1, 2))[pos_inds])
+
+            scores = np.vstack(scores_list)
+            order = scores.ravel().argsort()[::-1]
+            bboxes = np.vstack(bboxes_list) / det_scale
+            pre_det = np.hstack((bboxes, scores)).astype(np.float32, copy=False)[order, :]
+            keep = det.nms(pre_det)
+            kpss = None
+            if det.use_kps:
+                kpss = (np.vstack(kpss_list) / det_scale)[order, :, :][keep, :, :]
+            outputs.append((pre_det[keep, :], kpss))
+
+        return outputs
+
+    def _anchor_centers(self, height, width, stride):
+        det = self.det_model
+        key = (height, width, stride)
+        if key not in det.center_cache:
+            anchor_centers = np.stack(np.mgrid[:height, :width][::-1], axis=-1).astype(np.float32)
+            anchor_centers = (anchor_centers * stride).reshape((-1, 2))
+            if det._num_anchors > 1:
+                anchor_centers = np.stack([anchor_centers] * det._num_anchors, axis=1).reshape((-1, 2))
+            if len(det.center_cache) >= 100:
+                return anchor_centers
+            det.center_cache[key] = anchor_centers
+        return det.center_cache[key]
+
+    def _embed(self, images, faces):
+        if self.rec_model is None:
+            return np.zeros((len(faces), 0), dtype=np.float32)
+
+        size = self.rec_model.input_size[0]
+        crops = [
+            face_align.norm_crop(images[frame_idx], landmark=face["kps"], image_size=size)
+            for frame_idx, face in faces
+        ]
+        if self.rec_batched:
+            feats = self.rec_model.get_feat(crops)
+        else:
+            feats = np.vstack([self.rec_model.get_feat(crop) for crop in crops])
+        return feats.astype(np.float32, copy=False)
+
+    def _gender_age(self, images, faces):
+        if self.ga_model is None:
+            return None, None
+
+        ga = self.ga_model
+        size = ga.input_size[0]
+        crops = []
+        for frame_idx, face in faces:
+            bbox = face["bbox"]
+            w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+            center = ((bbox[2] + bbox[0]) / 2, (bbox[3] + bbox[1]) / 2)
+            scale = size / (max(w, h) * 1.5)
+            aimg, _ = face_align.transform(images[frame_idx], center, size, scale, 0)
+            crops.append(aimg)
+
+        def run(batch):
+            blob = cv2.dnn.blobFromImages(
+                batch, 1.0 / ga.input_std, tuple(ga.input_size),
+                (ga.input_mean, ga.input_mean, ga.input_mean), swapRB=True
+            )
+            return ga.session.run(ga.output_names, {ga.input_name: blob})[0]
+
+        if self.ga_batched:
+            preds = run(crops)
+        else:
+            preds = np.vstack([run([crop]) for crop in crops])
+
+        genders = np.argmax(preds[:, :2], axis=1)
+        ages = np.round(preds[:, 2] * 100).astype(int)
+        return genders, ages
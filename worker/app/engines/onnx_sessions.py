@@ -0,0 +1,90 @@
+import logging
+import os
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPT_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL"
+}
+
+# Weight variants live in a "variants" folder of the model pack, out of reach of
+# FaceAnalysis, which loads every *.onnx at the pack's top level:
+# buffalo_s/det_500m.onnx -> buffalo_s/variants/det_500m.int8.onnx / det_500m.fp16.onnx
+VARIANTS_DIR = "variants"
+PRECISIONS = ("fp32", "fp16", "int8")
+
+
+def intra_op_threads():
+    """
+    ORT_INTRA_OP_THREADS, or the cores split across inference workers so
+    concurrent calls do not oversubscribe the CPU.
+    """
+    if settings.ort_intra_op_threads > 0:
+        return settings.ort_intra_op_threads
+    return max(1, (os.cpu_count() or 1) // max(1, settings.inference_workers))
+
+
+def session_options():
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads()
+    options.inter_op_num_threads = max(1, settings.ort_inter_op_threads)
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = getattr(
+        ort.GraphOptimizationLevel, GRAPH_OPT_LEVELS.get(settings.ort_graph_optimization, "ORT_ENABLE_ALL")
+    )
+    # The arena keeps peak activation memory reserved per session; off trades a
+    # little allocation time for a smaller resident set on RAM-capped hosts
+    options.enable_cpu_mem_arena = settings.ort_mem_arena
+    options.enable_mem_pattern = settings.ort_mem_arena
+    return options
+
+
+def variant_path(model_file, precision):
+    if precision == "fp32":
+        return model_file
+    folder, name = os.path.split(model_file)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, VARIANTS_DIR, f"{stem}.{precision}{ext}")
+
+
+def rebuild_session(model, precision="fp32", providers=None):
+    """
+    Replaces the session InsightFace created for `model` (default options,
+    FP32 weights) with one using the tuned options and, when present, the
+    requested weight variant. A variant that is missing or that this ONNX
+    Runtime cannot load falls back to the FP32 file. Returns the file actually
+    loaded, or None when the model exposes no file to reload.
+    """
+    model_file = getattr(model, "model_file", None)
+    if model is None or not model_file:
+        return None
+    import onnxruntime as ort
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Available: {', '.join(PRECISIONS)}")
+
+    providers = providers or ["CPUExecutionProvider"]
+    path = variant_path(model_file, precision)
+    if path != model_file:
+        if not os.path.exists(path):
+            logger.warning("%s not found; %s stays FP32 (create variants with python -m scripts.quantize_models)",
+                           os.path.basename(path), os.path.basename(model_file))
+        else:
+            # Variants keep FP32 inputs/outputs and tensor names, so the model
+            # wrapper's cached input/output metadata stays valid
+            try:
+                model.session = ort.InferenceSession(path, sess_options=session_options(), providers=providers)
+                return path
+            except Exception as e:
+                # e.g. integer kernels missing from this ONNX Runtime build
+                logger.warning("Could not load %s (%s); %s stays FP32",
+                               os.path.basename(path), e, os.path.basename(model_file))
+
+    model.session = ort.InferenceSession(model_file, sess_options=session_options(), providers=providers)
+    return model_file
@@ -1,5 +1,12 @@
-from deep_sort_realtime.deepsort_tracker import DeepSort
 import numpy as np
+from app.core.model_registry import model_registry
+
+def _import_deep_sort():
+    # Deferred so importing the service does not pay for deep_sort_realtime
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+    return DeepSort
+
+model_registry.register("tracker", _import_deep_sort)
 
 class TrackerEngine:
     def __init__(self, max_age=30, n_init=3, max_cosine_distance=0.4):
@@ -7,6 +14,7 @@ class TrackerEngine:
         DeepSORT Tracker for stable identity tracking.
         Using external embeddings (ArcFace).
         """
+        DeepSort = model_registry.get("tracker")
         self.tracker = DeepSort(
             max_age=max_age,
             n_init=n_init,
@@ -37,3 +45,40 @@ class TrackerEngine:
             })
             
         return active_tracks
+
+    def advance(self):
+        """
+        Ages every track by one frame without predicting or matching, for
+        frames the motion gate found unchanged: nothing moved, and no track
+        should count as missed.
+        """
+        for track in self.tracker.tracker.tracks:
+            track.age += 1
+
+    def has_tentative(self):
+        """
+        Whether some track still waits for the matches that confirm it.
+        """
+        return any(track.is_tentative() for track in self.tracker.tracker.tracks)
+
+    def deleted_track_ids(self):
+        """
+        Track ids DeepSORT removed during the last update (missed for longer than max_age).
+        """
+        return [int(track_id) for track_id in self.tracker.tracker.del_tracks_ids]
+
+    def predicted_boxes(self):
+        """
+        Kalman-predicted [x1, y1, x2, y2] for the next frame of every confirmed,
+        recently matched track, without advancing the filter.
+        """
+        tracker = self.tracker.tracker
+        predicted = []
+        for track in tracker.tracks:
+            if not track.is_confirmed() or track.time_since_update > 1:
+                continue
+            mean, _ = tracker.kf.predict(track.mean, track.covariance)
+            cx, cy, aspect, h = mean[:4]
+            w = aspect * h
+            predicted.append((int(track.track_id), [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]))
+        return predicted
@@ -1,5 +1,22 @@
+from typing import Optional
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
 from app.api.v1.face_routes import router
+from app.api.v1.identity_routes import router as identity_router
+from app.api.v1.batch_routes import router as batch_router
+from app.api.v1.cluster_routes import router as cluster_router
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.metrics import metrics
+from app.core.profiler import request_profiler
+from app.services.inference_executor import inference_executor
+from app.services.gallery_service import open_gallery, close_gallery
+
+# Eager mode loads at import, so a pre-forking server (gunicorn --preload) or
+# the process inference pool forks children that share the loaded weights
+if settings.model_warmup == "eager":
+    model_registry.warm_up(freeze=True)
 
 app = FastAPI(title="10Sight Face Detection Worker")
 
@@ -7,4 +24,51 @@ app = FastAPI(title="10Sight Face Detection Worker")
 async def root():
     return {"message": "10Sight Face Detection Worker is running", "api_docs": "/docs"}
 
-app.include_router(router, prefix="/api/v1")
\ No newline at end of file
+@app.get("/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    status = model_registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    # Prometheus text exposition format 0.0.4
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+class ProfilerSettings(BaseModel):
+    enabled: Optional[bool] = None
+    threshold_ms: Optional[float] = None
+    interval_ms: Optional[float] = None
+
+@app.get("/debug/profiler")
+async def profiler_status():
+    return request_profiler.status()
+
+@app.put("/debug/profiler")
+async def configure_profiler(update: ProfilerSettings):
+    request_profiler.configure(update.enabled, update.threshold_ms, update.interval_ms)
+    return request_profiler.status()
+
+@app.delete("/debug/profiler")
+async def clear_profiles():
+    request_profiler.clear()
+    return request_profiler.status()
+
+@app.on_event("startup")
+def startup_models():
+    if settings.model_warmup == "background":
+        model_registry.start_background_warm_up()
+    open_gallery()
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    inference_executor.shutdown()
+    close_gallery()
+
+app.include_router(router, prefix="/api/v1")
+app.include_router(identity_router, prefix="/api/v1")
+app.include_router(batch_router, prefix="/api/v1")
+app.include_router(cluster_router, prefix="/api/v1")
@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class BatchJob:
+    def __init__(self, total, kind="static"):
+        """
+        Progress of one bulk ingestion job: images finished, faces found,
+        failures and throughput so far.
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.total = total
+        self.processed = 0
+        self.failed = 0
+        self.faces = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        # Final output for jobs that report once at the end (video summaries)
+        self.result = None
+        self.error = None
+
+    def record(self, faces=0, failed=False):
+        self.processed += 1
+        self.faces += faces
+        if failed:
+            self.failed += 1
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.finished_at = time.monotonic()
+
+    def stats(self):
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        if self.error:
+            state = "failed"
+        else:
+            state = "done" if self.finished_at else "running"
+        return {
+            "job": self.job_id,
+            "kind": self.kind,
+            "state": state,
+            "total": self.total,
+            "processed": self.processed,
+            "failed": self.failed,
+            "faces": self.faces,
+            "elapsedSeconds": round(elapsed, 2),
+            "imagesPerSecond": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "error": self.error
+        }
+
+
+class BatchJobRegistry:
+    def __init__(self, max_jobs=100):
+        """
+        Keeps the most recent jobs so their progress can be polled while (and
+        shortly after) their results stream.
+        """
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, total, kind="static"):
+        job = BatchJob(total, kind)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return [job.stats() for job in self._jobs.values()]
+
+
+batch_jobs = BatchJobRegistry()
@@ -0,0 +1,48 @@
+import threading
+import cv2
+
+
+class BestCropStore:
+    def __init__(self, max_side=160):
+        """
+        Highest-quality face crop seen so far for each track of one stream,
+        downscaled to at most `max_side` pixels, for thumbnails and enrolment.
+        """
+        self.max_side = max_side
+        self._crops = {}  # track_id -> (quality, crop)
+        self._lock = threading.Lock()
+
+    def offer(self, track_id, quality, img, bbox):
+        """
+        Keeps the crop of `bbox` from `img` when `quality` beats the track's best.
+        """
+        with self._lock:
+            current = self._crops.get(track_id)
+            if current is not None and current[0] >= quality:
+                return False
+        height, width = img.shape[:2]
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        crop = img[max(0, y1):min(height, y2), max(0, x1):min(width, x2)]
+        if crop.size == 0:
+            return False
+        scale = self.max_side / max(crop.shape[:2])
+        if scale < 1.0:
+            crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), max(1, int(crop.shape[0] * scale))),
+                              interpolation=cv2.INTER_AREA)
+        else:
+            crop = crop.copy()
+        with self._lock:
+            self._crops[track_id] = (quality, crop)
+        return True
+
+    def get(self, track_id):
+        with self._lock:
+            return self._crops.get(track_id)
+
+    def evict(self, track_ids):
+        with self._lock:
+            for track_id in track_ids:
+                self._crops.pop(track_id, None)
+
+    def __len__(self):
+        return len(self._crops)
@@ -0,0 +1,410 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.gallery_index import GalleryIndex, normalize_rows
+from app.services.gallery_service import gallery
+
+
+class Cluster:
+    __slots__ = ("cluster_id", "sum", "members", "sightings", "exemplars", "streams", "first_seen", "last_seen",
+                 "checked_members", "absorbed")
+
+    def __init__(self, cluster_id, dim):
+        self.cluster_id = cluster_id
+        self.sum = np.zeros(dim, dtype=np.float32)
+        self.members = 0
+        self.sightings = 0
+        self.exemplars = []  # [(quality, vector, info)], best first
+        self.streams = set()
+        self.first_seen = self.last_seen = time.time()
+        # Members at the last merge check (the lookup that created it found no neighbour)
+        self.checked_members = 1
+        self.absorbed = []  # ids merged into this cluster, aliased to it until it goes
+
+    def add_exemplar(self, quality, vector, info, max_exemplars):
+        if len(self.exemplars) >= max_exemplars and quality <= self.exemplars[-1][0]:
+            return
+        self.exemplars.append((quality, vector, info))
+        self.exemplars.sort(key=lambda exemplar: -exemplar[0])
+        del self.exemplars[max_exemplars:]
+
+    def summary(self, exemplars=False):
+        out = {
+            "id": self.cluster_id,
+            "members": self.members,
+            "sightings": self.sightings,
+            "streams": sorted(self.streams),
+            "firstSeen": round(self.first_seen * 1000),
+            "lastSeen": round(self.last_seen * 1000),
+            "bestQuality": round(self.exemplars[0][0], 4) if self.exemplars else None
+        }
+        if exemplars:
+            out["exemplars"] = [dict(info, quality=round(quality, 4)) for quality, _, info in self.exemplars]
+        return out
+
+
+class FaceClusterer:
+    def __init__(self, dim=512, threshold=0.45, merge_threshold=0.6, split_threshold=0.2, min_quality=0.4,
+                 max_exemplars=5, max_clusters=100000, maintain_every=500, approximate_threshold=4096,
+                 n_probe=16, hot_clusters=2048, max_tracks=20000, requality_margin=0.05):
+        """
+        Online clustering of unknown face embeddings.
+
+        Each embedding joins the cluster whose normalized centroid is most
+        similar (at least `threshold`), or starts a new one. Centroids live in a
+        GalleryIndex, searched exactly over the `hot_clusters` most recently seen
+        clusters first (repeat visitors), then over all clusters, which switches
+        to IVF search past `approximate_threshold` clusters. A live track joins
+        once and is not searched again; it only feeds its cluster when its face
+        quality improves. Every
+        `maintain_every` updates, clusters touched since the last pass are split
+        when two of their exemplars are less similar than `split_threshold`,
+        and those whose membership doubled since their last check are merged
+        into a neighbour closer than `merge_threshold`.
+        Clusters keep their `max_exemplars` best-quality sightings; beyond
+        `max_clusters` the least recently seen cluster is dropped, along with
+        the aliases of the clusters merged into it. The centroid index trains
+        its IVF lists on a background thread.
+        """
+        self.dim = dim
+        self.threshold = threshold
+        self.merge_threshold = merge_threshold
+        self.split_threshold = split_threshold
+        self.min_quality = min_quality
+        self.max_exemplars = max_exemplars
+        self.max_clusters = max_clusters
+        self.maintain_every = maintain_every
+        self.max_tracks = max_tracks
+        self.requality_margin = requality_margin
+
+        self.hot_clusters = hot_clusters
+
+        self.index = GalleryIndex(dim=dim, approximate_threshold=approximate_threshold, n_probe=n_probe,
+                                  background_train=True)
+        self._hot = GalleryIndex(dim=dim, capacity=hot_clusters + 1, approximate_threshold=hot_clusters + 1)
+        self._hot_order = OrderedDict()  # cluster ids in the hot index, least recently seen first
+        self._clusters = OrderedDict()  # cluster_id -> Cluster, least recently seen first
+        self._aliases = {}  # merged cluster id -> surviving id, for live clusters only
+        self._tracks = OrderedDict()  # (stream_id, track_id) -> (cluster_id, best quality)
+        self._dirty = set()
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self.updates = self.merges = self.splits = self.evicted = 0
+
+    def resolve(self, cluster_id):
+        """
+        The surviving id of a cluster that may have been merged away, or None.
+        """
+        with self._lock:
+            cluster_id = self._aliases.get(cluster_id, cluster_id)
+            return cluster_id if cluster_id in self._clusters else None
+
+    def _nearest(self, vectors):
+        nearest = [matches[0]["id"] if matches else None
+                   for matches in self._hot.search(vectors, k=1, min_score=self.threshold)]
+        cold = [i for i, cluster_id in enumerate(nearest) if cluster_id is None]
+        if cold and len(self.index) > len(self._hot):
+            for i, matches in zip(cold, self.index.search(vectors[cold], k=1, min_score=self.threshold)):
+                nearest[i] = matches[0]["id"] if matches else None
+        return nearest
+
+    def assign_many(self, items, learn=True):
+        """
+        Cluster ids for (embedding, quality, stream_id, track_id) items; track_id
+        None for stills. With `learn` false, or below `min_quality`, faces are only
+        looked up (None when no cluster is close enough) and nothing changes.
+        """
+        if not items:
+            return []
+        vectors = normalize_rows([embedding for embedding, _, _, _ in items])
+        with self._lock:
+            tracked_clusters, best_qualities = [], []
+            for vector, (_, _, stream_id, track_id) in zip(vectors, items):
+                tracked = self._tracks.get((stream_id, track_id)) if track_id is not None else None
+                cluster = self._clusters.get(self.resolve(tracked[0])) if tracked is not None else None
+                # Track ids restart with a new stream session, so the face must still fit the cluster
+                if cluster is not None and float(normalize_rows(cluster.sum)[0] @ vector) < self.threshold:
+                    cluster = None
+                tracked_clusters.append(cluster)
+                best_qualities.append(tracked[1] if cluster is not None else None)
+            nearest = [None] * len(items)
+            pending = [i for i, cluster in enumerate(tracked_clusters) if cluster is None]
+            if pending and self._clusters:
+                for i, near in zip(pending, self._nearest(vectors[pending])):
+                    nearest[i] = near
+
+            out = []
+            for i, (vector, (_, quality, stream_id, track_id)) in enumerate(zip(vectors, items)):
+                quality = 1.0 if quality is None else quality
+                key = (stream_id, track_id) if track_id is not None else None
+                cluster = tracked_clusters[i]
+                if cluster is not None:
+                    cluster_id = cluster.cluster_id
+                    if learn:
+                        cluster.sightings += 1
+                        self._touch(cluster)
+                        self._tracks[key] = (cluster_id, best_qualities[i])
+                        self._tracks.move_to_end(key)
+                        if quality > best_qualities[i] + self.requality_margin:
+                            # A better look at the same track refines its cluster
+                            self._feed(cluster, vector, quality, stream_id, track_id, new_member=False)
+                            self._tracks[key] = (cluster_id, quality)
+                    out.append(cluster_id)
+                    continue
+
+                near = nearest[i]
+                if not learn or quality < self.min_quality:
+                    out.append(self.resolve(near) if near is not None else None)
+                    continue
+
+                cluster = self._clusters.get(self.resolve(near)) if near is not None else None
+                if cluster is None:
+                    cluster = self._create()
+                cluster.sightings += 1
+                self._touch(cluster)
+                self._feed(cluster, vector, quality, stream_id, track_id, new_member=True)
+                if key is not None:
+                    self._tracks[key] = (cluster.cluster_id, quality)
+                    while len(self._tracks) > self.max_tracks:
+                        self._tracks.popitem(last=False)
+                out.append(cluster.cluster_id)
+
+            if self.updates >= self.maintain_every:
+                self.maintain()
+            return out
+
+    def _create(self, keep=None):
+        # `keep`: a cluster being split, which must survive the eviction
+        cluster = Cluster(self._next_id, self.dim)
+        self._next_id += 1
+        self._clusters[cluster.cluster_id] = cluster
+        while len(self._clusters) > self.max_clusters:
+            old_id = next((cluster_id for cluster_id in self._clusters if cluster_id != keep), None)
+            if old_id is None or old_id == cluster.cluster_id:
+                break
+            self._drop(self._clusters.pop(old_id))
+            self.evicted += 1
+        return cluster
+
+    def _drop(self, cluster):
+        cluster_id = cluster.cluster_id
+        for alias in cluster.absorbed:
+            self._aliases.pop(alias, None)
+        self.index.remove(cluster_id)
+        self._hot_order.pop(cluster_id, None)
+        self._hot.remove(cluster_id)
+        self._dirty.discard(cluster_id)
+
+    def _place(self, cluster):
+        # Centroid changed: both indexes follow
+        self.index.upsert(cluster.cluster_id, cluster.sum)
+        if cluster.cluster_id in self._hot_order:
+            self._hot.upsert(cluster.cluster_id, cluster.sum)
+
+    def _touch(self, cluster):
+        cluster.last_seen = time.time()
+        self._clusters.move_to_end(cluster.cluster_id)
+        if cluster.cluster_id in self._hot_order:
+            self._hot_order.move_to_end(cluster.cluster_id)
+            return
+        self._hot_order[cluster.cluster_id] = None
+        self._hot.upsert(cluster.cluster_id, cluster.sum)
+        while len(self._hot_order) > self.hot_clusters:
+            old_id, _ = self._hot_order.popitem(last=False)
+            self._hot.remove(old_id)
+
+    def _feed(self, cluster, vector, quality, stream_id, track_id, new_member):
+        # Quality-weighted running sum; its direction is the centroid (floored so
+        # a zero score with CLUSTER_MIN_QUALITY 0 still gives it one)
+        cluster.sum += vector * max(quality, 0.01)
+        if new_member:
+            cluster.members += 1
+        cluster.streams.add(stream_id)
+        info = {"streamId": stream_id, "trackId": track_id, "seenAt": round(cluster.last_seen * 1000)}
+        cluster.add_exemplar(quality, vector, info, self.max_exemplars)
+        self._place(cluster)
+        self._dirty.add(cluster.cluster_id)
+        self.updates += 1
+
+    def maintain(self):
+        """
+        Merge/split pass over the clusters changed since the last pass.
+        """
+        with self._lock:
+            dirty = [cluster_id for cluster_id in self._dirty if cluster_id in self._clusters]
+            self._dirty = set()
+            self.updates = 0
+            for cluster_id in dirty:
+                if cluster_id in self._clusters:
+                    self._maybe_split(self._clusters[cluster_id])
+
+            # A centroid barely moves until its membership doubles
+            clusters = []
+            for cluster_id in dirty:
+                cluster = self._clusters.get(cluster_id)
+                if cluster is not None and cluster.members >= 2 * cluster.checked_members:
+                    clusters.append(cluster)
+                    cluster.checked_members = cluster.members
+            if clusters:
+                found = self.index.search(np.stack([cluster.sum for cluster in clusters]), k=2,
+                                          min_score=self.merge_threshold)
+                for cluster, matches in zip(clusters, found):
+                    other = next((m["id"] for m in matches if m["id"] != cluster.cluster_id), None)
+                    if other is not None:
+                        self._merge(cluster.cluster_id, other)
+
+    def _merge(self, a, b):
+        a, b = self.resolve(a), self.resolve(b)
+        if a is None or b is None or a == b:
+            return
+        keep, gone = self._clusters[a], self._clusters[b]
+        # Earlier merges in the pass may have moved either centroid
+        if float(normalize_rows(keep.sum)[0] @ normalize_rows(gone.sum)[0]) < self.merge_threshold:
+            return
+        if gone.members > keep.members:
+            keep, gone = gone, keep
+        keep.sum += gone.sum
+        keep.members += gone.members
+        keep.sightings += gone.sightings
+        keep.streams |= gone.streams
+        keep.checked_members = 0
+        keep.first_seen = min(keep.first_seen, gone.first_seen)
+        keep.last_seen = max(keep.last_seen, gone.last_seen)
+        for quality, vector, info in gone.exemplars:
+            keep.add_exemplar(quality, vector, info, self.max_exemplars)
+        # Aliases always name a live cluster directly
+        keep.absorbed += gone.absorbed + [gone.cluster_id]
+        for alias in gone.absorbed:
+            self._aliases[alias] = keep.cluster_id
+        self._aliases[gone.cluster_id] = keep.cluster_id
+        gone.absorbed = []
+        del self._clusters[gone.cluster_id]
+        self._drop(gone)
+        self._place(keep)
+        self.merges += 1
+
+    def _maybe_split(self, cluster):
+        if len(cluster.exemplars) < 4:
+            return
+        vectors = np.stack([vector for _, vector, _ in cluster.exemplars])
+        similarity = vectors @ vectors.T
+        a, b = np.unravel_index(np.argmin(similarity), similarity.shape)
+        if similarity[a, b] >= self.split_threshold:
+            return
+        # Two seeds that disagree most; every exemplar follows the closer one
+        to_b = similarity[:, b] > similarity[:, a]
+        if to_b.all() or not to_b.any():
+            return
+        weights = np.array([quality for quality, _, _ in cluster.exemplars], dtype=np.float32)
+        share_b = float(to_b.sum()) / len(to_b)
+        total = float(np.linalg.norm(cluster.sum)) or 1.0
+
+        new = self._create(keep=cluster.cluster_id)
+        new.exemplars = [e for e, moved in zip(cluster.exemplars, to_b) if moved]
+        cluster.exemplars = [e for e, moved in zip(cluster.exemplars, to_b) if not moved]
+        # Members and centroid mass are shared out by exemplar count; members are not kept
+        new.members = max(1, int(round(cluster.members * share_b)))
+        cluster.members = max(1, cluster.members - new.members)
+        new.sightings = int(round(cluster.sightings * share_b))
+        cluster.sightings -= new.sightings
+        new.streams = {info["streamId"] for _, _, info in new.exemplars}
+        for part, mask in ((new, to_b), (cluster, ~to_b)):
+            direction = normalize_rows((vectors[mask] * weights[mask, None]).sum(axis=0))[0]
+            part.sum = direction * total * (share_b if part is new else 1.0 - share_b)
+            self._place(part)
+        # Hot like its parent, or the parent keeps catching its faces first
+        self._touch(new)
+        new.first_seen, new.last_seen = cluster.first_seen, cluster.last_seen
+        self.splits += 1
+
+    def get(self, cluster_id):
+        with self._lock:
+            cluster = self._clusters.get(self.resolve(cluster_id))
+            return cluster.summary(exemplars=True) if cluster is not None else None
+
+    def list(self, min_members=1, stream_id=None, limit=100):
+        """
+        Cluster summaries, most recently seen first.
+        """
+        with self._lock:
+            out = []
+            for cluster in reversed(self._clusters.values()):
+                if cluster.members < min_members or (stream_id is not None and stream_id not in cluster.streams):
+                    continue
+                out.append(cluster.summary())
+                if len(out) >= limit:
+                    break
+            return out
+
+    def search(self, embedding, k=5, min_score=None):
+        """
+        Clusters nearest to `embedding`, best first, each summary with its `score`.
+        """
+        with self._lock:
+            matches = self.index.search(embedding, k=k, min_score=min_score)[0]
+            return [dict(self._clusters[m["id"]].summary(), score=m["score"])
+                    for m in matches if m["id"] in self._clusters]
+
+    def remove(self, cluster_id):
+        with self._lock:
+            cluster_id = self.resolve(cluster_id)
+            if cluster_id is None:
+                return False
+            self._drop(self._clusters.pop(cluster_id))
+            return True
+
+    def __len__(self):
+        return len(self._clusters)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clusters": len(self._clusters),
+                "aliases": len(self._aliases),
+                "hotClusters": len(self._hot_order),
+                "trackedTracks": len(self._tracks),
+                "merges": self.merges,
+                "splits": self.splits,
+                "evicted": self.evicted,
+                "index": self.index.stats()
+            }
+
+
+face_clusters = FaceClusterer(
+    threshold=settings.cluster_threshold,
+    merge_threshold=settings.cluster_merge_threshold,
+    min_quality=settings.cluster_min_quality,
+    max_clusters=settings.cluster_max,
+    approximate_threshold=settings.cluster_ann_threshold
+)
+metrics.gauge("face_clusters", "Clusters of unknown faces.", callback=lambda: len(face_clusters))
+
+
+def cluster_faces(faces, stream_id=None, learn=True):
+    """
+    Sets `clusterId` on every face of a detect result: None for faces without
+    an embedding or that match a gallery identity, otherwise the unknown-face
+    cluster it belongs to. Static results have no track, so each call counts
+    as a new sighting.
+    """
+    candidates = [face for face in faces if face.get("embedding") is not None and len(face["embedding"])]
+    for face in faces:
+        face["clusterId"] = None
+    if not settings.cluster_enabled or not candidates:
+        return faces
+    if len(gallery):
+        matches = gallery.search(np.stack([face["embedding"] for face in candidates]), k=1,
+                                 min_score=settings.cluster_known_score)
+        candidates = [face for face, match in zip(candidates, matches) if not match]
+    items = []
+    for face in candidates:
+        quality = face.get("quality")
+        track_id = face.get("track_id", -1)
+        items.append((face["embedding"], quality["score"] if quality else None, stream_id or "static",
+                      track_id if track_id is not None and track_id >= 0 else None))
+    for face, cluster_id in zip(candidates, face_clusters.assign_many(items, learn=learn)):
+        face["clusterId"] = cluster_id
+    return faces
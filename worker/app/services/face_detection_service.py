@@ -1,96 +1,249 @@
 import cv2
+import json
+import logging
 import numpy as np
 import os
-from collections import deque
-from app.engines.insightface_engine import InsightFaceEngine
-from app.engines.tracker_engine import TrackerEngine
+import threading
+from app.services.micro_batcher import MicroBatcher
+from app.services.stream_sessions import StreamSessionManager
+from app.utils.association import assign_detections, associate
+from app.utils.image_decode import DecodedImage
+from app.utils.face_quality import assess
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.metrics import (
+    metrics, stage_seconds, frames_total, faces_total, frames_dropped_total, tracks_deleted_total, errors_total,
+    faces_gated_total
+)
+from app.core.profiles import get_profile, detection_size, model_packs, MIN_DET_THRESH
 
-# Initialize new engines
-insight_engine = InsightFaceEngine(model_name='buffalo_s')
-tracker_engine = TrackerEngine(max_age=30, n_init=1, max_cosine_distance=0.4)
+logger = logging.getLogger(__name__)
 
-# Track State Management for Temporal Smoothing
-# track_id -> {age_history, gender_history, embedding_history}
-track_states = {}
+# Faces narrower than the ArcFace crop on a reduced decode are recognised at full resolution
+REC_FACE_SIDE = 112
 
-def get_smoothed_demographics(track_id, age, gender, embedding):
+# Engines are built on first use (or by the startup warm-up), not at import
+def _insight_engine_factory(model_name):
+    def build():
+        from app.engines.insightface_engine import InsightFaceEngine
+        return InsightFaceEngine(model_name=model_name, det_thresh=MIN_DET_THRESH)
+    return build
+
+# Only the packs behind the configured default profiles gate readiness;
+# other tiers load on the first request that asks for them
+default_packs = {get_profile(settings.live_profile)["model"], get_profile(settings.static_profile)["model"]}
+for pack in model_packs():
+    model_registry.register(f"insightface:{pack}", _insight_engine_factory(pack), required=pack in default_packs)
+
+def _build_emotion_engine():
+    from app.engines.emotion import EmotionEngine
+    return EmotionEngine(model_path=settings.emotion_model, max_faces=settings.emotion_max_faces)
+
+if settings.emotion_enabled:
+    model_registry.register("emotion", _build_emotion_engine, required=False)
+
+# One DeepSORT tracker + smoothing state per camera stream
+stream_sessions = StreamSessionManager(
+    idle_timeout=settings.stream_idle_timeout,
+    max_sessions=settings.max_stream_sessions,
+    tracker_kwargs={"max_age": 30, "n_init": 1, "max_cosine_distance": 0.4}
+)
+metrics.gauge("live_sessions", "Live stream tracker sessions.", callback=lambda: len(stream_sessions))
+metrics.gauge("live_track_states", "Tracks with smoothing state across live sessions.",
+              callback=lambda: stream_sessions.track_state_count())
+
+# Frames from concurrent pool threads share one batched detector call when enabled.
+# Only frames with the same pack, detector size and threshold can share a batch.
+# Recognition runs after the quality gate and is batched separately, per pack.
+batching_enabled = settings.batch_window_ms > 0 and settings.inference_mode == "thread"
+frame_batchers = {}
+recognition_batchers = {}
+frame_batchers_lock = threading.Lock()
+
+def _frame_batcher(model, det_size, det_thresh):
+    key = (model, det_size, det_thresh)
+    with frame_batchers_lock:
+        if key not in frame_batchers:
+            engine = model_registry.get(f"insightface:{model}")
+            frame_batchers[key] = MicroBatcher(
+                lambda images: engine.detect_batch(images, det_size=det_size, det_thresh=det_thresh),
+                max_batch=settings.batch_max_size,
+                window_ms=settings.batch_window_ms
+            )
+        return frame_batchers[key]
+
+def _recognize_requests(engine, requests):
+    # One recognizer call for the (images, pairs) of several requests; faces are updated in place
+    images, pairs = [], []
+    for request_images, request_pairs in requests:
+        pairs.extend((len(images) + frame_idx, face) for frame_idx, face in request_pairs)
+        images.extend(request_images)
+    engine.recognize(images, pairs)
+    return [None] * len(requests)
+
+def _recognition_batcher(model):
+    with frame_batchers_lock:
+        if model not in recognition_batchers:
+            engine = model_registry.get(f"insightface:{model}")
+            recognition_batchers[model] = MicroBatcher(
+                lambda requests: _recognize_requests(engine, requests),
+                max_batch=settings.batch_max_size,
+                window_ms=settings.batch_window_ms
+            )
+        return recognition_batchers[model]
+
+def _run_recognition(model, images, pairs):
+    with stage_seconds.time(stage="recognize"):
+        if batching_enabled:
+            _recognition_batcher(model).submit((images, pairs))
+        else:
+            model_registry.get(f"insightface:{model}").recognize(images, pairs)
+
+def _detect(img, profile):
+    det_size = detection_size(profile, img.shape)
+    with stage_seconds.time(stage="detect"):
+        if batching_enabled:
+            return _frame_batcher(profile["model"], det_size, profile["det_thresh"]).submit(img)
+        engine = model_registry.get(f"insightface:{profile['model']}")
+        return engine.detect(img, det_size=det_size, det_thresh=profile["det_thresh"])
+
+def _recognize(tier, decoded, faces):
     """
-    Apply temporal smoothing to age, gender, and embeddings for a specific track.
+    Recognition for (frame_idx, face) pairs found on `decoded.img`. Faces too
+    small there for the recognition crop are recognised on the full-resolution
+    image, which is only decoded when such a face exists.
     """
-    if track_id not in track_states:
-        track_states[track_id] = {
-            "age_history": deque(maxlen=7),
-            "gender_history": deque(maxlen=7),
-            "embedding_history": deque(maxlen=5)
-        }
-    
-    state = track_states[track_id]
-    
-    # Robust demographic handling
-    if age is not None:
-        try:
-            state["age_history"].append(int(age))
-        except: pass
-    if gender is not None:
-        try:
-            state["gender_history"].append(int(gender))
-        except: pass
-    if embedding is not None:
-        state["embedding_history"].append(np.array(embedding))
-    
-    # Age: average of history (default 25)
-    smoothed_age = int(np.mean(state["age_history"])) if state["age_history"] else 25
-    
-    # Gender: majority voting (0: Female, 1: Male, default 1)
-    smoothed_gender = max(set(state["gender_history"]), key=list(state["gender_history"]).count) if state["gender_history"] else 1
-    
-    # Embedding: mean vector
-    if state["embedding_history"]:
-        smoothed_embedding = np.mean(state["embedding_history"], axis=0).tolist()
-    else:
-        smoothed_embedding = (np.zeros(512)).tolist()
-    
-    return smoothed_age, smoothed_gender, smoothed_embedding
+    if not faces:
+        return
+    if decoded.factor == 1:
+        _run_recognition(tier["model"], [decoded.img], faces)
+        return
+
+    pairs, upscaled = [], []
+    for _, face in faces:
+        x1, y1, x2, y2 = face["bbox"]
+        if min(x2 - x1, y2 - y1) >= REC_FACE_SIDE:
+            pairs.append((0, face))
+        else:
+            upscaled.append(face)
+    images = [decoded.img]
+    full_faces = []
+    if upscaled:
+        sx, sy = decoded.full_scale()
+        images.append(decoded.full)
+        for face in upscaled:
+            x1, y1, x2, y2 = face["bbox"]
+            full_face = {
+                "bbox": [int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy)],
+                "kps": face["kps"] * np.array([sx, sy], dtype=np.float32) if face["kps"] is not None else None,
+                "det_score": face["det_score"]
+            }
+            full_faces.append(full_face)
+            pairs.append((1, full_face))
+
+    _run_recognition(tier["model"], images, pairs)
+    for face, full_face in zip(upscaled, full_faces):
+        face.update({key: full_face[key] for key in ("embedding", "age", "gender")})
+
+def _assess(decoded, faces):
+    # Sizes are judged in full-resolution pixels, whatever scale the frame was decoded at
+    with stage_seconds.time(stage="quality"):
+        for face in faces:
+            face["quality"] = assess(decoded.img, face, scale=decoded.factor)
+
+def _analyze_decoded(decoded, tier):
+    faces = _detect(decoded.img, tier)
+    _assess(decoded, faces)
+    passing = []
+    for face in faces:
+        if face["quality"]["score"] >= tier["min_quality"]:
+            passing.append((0, face))
+        else:
+            face.update({"embedding": None, "age": None, "gender": None})
+    faces_gated_total.inc(len(faces) - len(passing), mode="static")
+    _recognize(tier, decoded, passing)
+    return faces
+
+def _emotions(img, boxes, session=None):
+    """
+    Emotion per face box from one landmarker pass over the frame, or None
+    per box when the stage is disabled or fails. Live sessions keep their own
+    VIDEO-mode landmarker.
+    """
+    if not settings.emotion_enabled or not boxes:
+        return [None] * len(boxes)
+    try:
+        engine = model_registry.get("emotion")
+        landmarker = None
+        if session is not None:
+            if session.emotion is None and not session.closed:
+                session.emotion = engine.stream_landmarker()
+            landmarker = session.emotion
+        with stage_seconds.time(stage="emotion"):
+            return engine.analyze(img, boxes, landmarker=landmarker)
+    except Exception:
+        logger.exception("Emotion analysis failed")
+        errors_total.inc(engine="emotion")
+        return [None] * len(boxes)
 
-def process_face_pipeline(image_bytes: bytes, is_static: bool = False, **kwargs):
+def process_face_pipeline(image_bytes: bytes, is_static: bool = False, stream_id: str = "default",
+                          profile: str = None, **kwargs):
     """
     Refactored Phase 2.0 Pipeline using InsightFace and DeepSORT.
+    `profile` picks the model tier; by default static uploads use STATIC_PROFILE
+    and streams keep whatever tier they last asked for (LIVE_PROFILE initially).
     """
-    np_arr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    if is_static:
+        tier = get_profile(profile or settings.static_profile)
+    else:
+        session = stream_sessions.get(stream_id)
+        if profile:
+            if profile != session.profile:
+                session.motion.reset()
+            session.profile = profile
+        tier = get_profile(session.profile or settings.live_profile)
+
+    # Large JPEGs are decoded at a reduced scale that still covers the detector input
+    with stage_seconds.time(stage="decode"):
+        decoded = DecodedImage(image_bytes, lambda shape: detection_size(tier, shape)[0],
+                               min_side=settings.decode_min_side)
+    img = decoded.img
 
     if img is None:
+        frames_dropped_total.inc(reason="undecodable")
         return {"faceDetected": False, "totalFaces": 0, "faces": []}
 
-    # 1. InsightFace Analysis
-    try:
-        raw_detections = insight_engine.analyze(img)
-    except:
-        return {"faceDetected": False, "totalFaces": 0, "faces": []}
-    
-    # 2. Prepare detections for DeepSORT
-    ds_detections = []
-    ds_embeds = []
-    
-    for i, det in enumerate(raw_detections):
-        x1, y1, x2, y2 = det["bbox"]
-        w = max(1, x2 - x1)
-        h = max(1, y2 - y1)
-        conf = det["det_score"]
-        emb = det["embedding"]
-        
-        ds_detections.append(([x1, y1, w, h], conf, f"face_{i}"))
-        ds_embeds.append(emb)
-
-    # 3. Handle Static Mode (Bypass Tracker)
     if is_static:
+        # 1. InsightFace Analysis
+        frames_total.inc(mode="static")
+        try:
+            raw_detections = _analyze_decoded(decoded, tier)
+        except Exception:
+            logger.exception("Static analysis failed")
+            errors_total.inc(engine="insightface")
+            return {"faceDetected": False, "totalFaces": 0, "faces": []}
+
+        # 2. Handle Static Mode (Bypass Tracker)
+        emotions = _emotions(decoded.img, [det["bbox"] for det in raw_detections])
         static_faces = []
-        for det in raw_detections:
+        for det, emotion in zip(raw_detections, emotions):
             x1, y1, x2, y2 = det["bbox"]
             conf = det["det_score"]
             emb = det["embedding"]
             age = det.get("age", 25)
             gender = det.get("gender", 1)
+            # Faces below the quality gate carry no embedding or demographics
+            demographics = None
+            if emb is not None:
+                demographics = {
+                    "age": int(age),
+                    "gender": "Male" if gender == 1 else "Female",
+                    "confidence": {
+                        "age": 0.9,
+                        "gender": 0.95
+                    },
+                    "livenessScore": round(float(conf * 0.98), 4)
+                }
 
             static_faces.append({
                 "track_id": -1,  # No tracking in static mode
@@ -104,63 +257,221 @@ def process_face_pipeline(image_bytes: bytes, is_static: bool = False, **kwargs)
                 "ymin": float(y1 / img.shape[0]),
                 "width": float((x2 - x1) / img.shape[1]),
                 "height": float((y2 - y1) / img.shape[0]),
-                "embedding": emb.tolist() if isinstance(emb, np.ndarray) else emb,
+                "embedding": emb,
                 "confidence": float(conf),
-                "demographics": {
-                    "age": int(age),
-                    "gender": "Male" if gender == 1 else "Female",
-                    "confidence": {
-                        "age": 0.9,
-                        "gender": 0.95
-                    },
-                    "livenessScore": round(float(conf * 0.98), 4)
-                }
+                "quality": det["quality"],
+                "demographics": demographics,
+                "emotions": emotion
             })
+        faces_total.inc(len(static_faces), mode="static")
         return {
             "faceDetected": len(static_faces) > 0,
             "totalFaces": len(static_faces),
             "faces": static_faces
         }
 
-    # 4. Update Tracker (Live Mode)
+    # Frames of one stream are applied in order; other streams proceed in parallel
+    with session.lock:
+        return _process_live_frame(session, decoded, tier)
+
+def _redetect_in_rois(session, img, tier, predicted, scale=1):
+    """
+    Between keyframes: run the detector on a small crop around each track's
+    Kalman-predicted box and reuse the track's cached embedding/demographics.
+    Returns None when any track cannot be re-found, so the caller falls back
+    to a full keyframe on this same frame.
+    """
+    height, width = img.shape[:2]
+    crops, origins = [], []
+    for _, (x1, y1, x2, y2) in predicted:
+        # Half a face of margin on every side absorbs motion and prediction error
+        mx, my = (x2 - x1) * 0.5, (y2 - y1) * 0.5
+        cx1, cy1 = max(0, int(x1 - mx)), max(0, int(y1 - my))
+        cx2, cy2 = min(width, int(x2 + mx)), min(height, int(y2 + my))
+        if cx2 - cx1 < 16 or cy2 - cy1 < 16:
+            return None
+        crops.append(img[cy1:cy2, cx1:cx2])
+        origins.append((cx1, cy1))
+
+    engine = model_registry.get(f"insightface:{tier['model']}")
+    roi_size = (settings.roi_det_size, settings.roi_det_size)
+    with stage_seconds.time(stage="roi_detect"):
+        found = engine.detect_batch(crops, det_size=roi_size, det_thresh=tier["det_thresh"])
+
+    detections = []
+    for (track_id, box), crop, (ox, oy), faces in zip(predicted, crops, origins, found):
+        if not faces:
+            return None
+        boxes = [[f["bbox"][0] + ox, f["bbox"][1] + oy, f["bbox"][2] + ox, f["bbox"][3] + oy] for f in faces]
+        det_indices, _ = associate([box], boxes, iou_threshold=0.3)
+        if det_indices[0] < 0:
+            return None
+        cached = session.track_states.current(track_id)
+        if cached is None:
+            return None
+        session.recognition_cache.record_hit()
+        age, gender, embedding = cached
+        best = faces[det_indices[0]]
+        detections.append({
+            "bbox": boxes[det_indices[0]],
+            "det_score": best["det_score"],
+            "quality": assess(crop, best, scale=scale),
+            "embedding": embedding,
+            "age": age,
+            "gender": gender,
+            "reused": True
+        })
+    return detections
+
+def _analyze_keyframe(session, decoded, tier, predicted):
+    """
+    Full-frame detection, then recognition only for faces whose track has no
+    usable cached result (see RecognitionCache); the rest reuse the track's
+    smoothed embedding and demographics. Faces below the quality gate reuse
+    their track's state, or are left untracked when they have none.
+    """
+    faces = _detect(decoded.img, tier)
+    _assess(decoded, faces)
+    cache = session.recognition_cache
+
+    # Detections are matched to tracks by their predicted boxes before DeepSORT runs
+    track_of = {}
+    if predicted and faces:
+        det_indices, _ = associate([box for _, box in predicted], [face["bbox"] for face in faces], iou_threshold=0.3)
+        for (track_id, _), det_index in zip(predicted, det_indices):
+            if det_index >= 0:
+                track_of[det_index] = track_id
+
+    kept, stale = [], []
+    for i, face in enumerate(faces):
+        track_id = track_of.get(i)
+        passes = face["quality"]["score"] >= tier["min_quality"]
+        if not passes:
+            faces_gated_total.inc(mode="live")
+            reason = None
+        else:
+            reason = cache.refresh_reason(track_id, face) if track_id is not None else "new"
+        cached = session.track_states.current(track_id) if reason is None and track_id is not None else None
+        if cached is None:
+            if not passes:
+                continue
+            cache.record_refresh(reason or "new")
+            stale.append((0, face))
+        else:
+            cache.record_hit()
+            age, gender, embedding = cached
+            face.update({"embedding": embedding, "age": age, "gender": gender, "reused": True})
+        kept.append(face)
+
+    if stale:
+        _recognize(tier, decoded, stale)
+    return kept
+
+def _process_live_frame(session, decoded, tier):
+    img = decoded.img
+    scheduler = session.scheduler
+    session.sightings = {}
+
+    # 0. A frame the motion gate finds unchanged gets the last result again;
+    # tentative tracks need real frames to be confirmed
+    if session.last_result is None or session.tracker.has_tentative():
+        session.motion.reset()
+    if session.motion.should_skip(img):
+        frames_dropped_total.inc(reason="unchanged")
+        session.tracker.advance()
+        # Copied faces: callers annotate them, and the next skip must not see that
+        faces = [dict(face) for face in session.last_result["faces"]]
+        return dict(session.last_result, faces=faces, keyframe=False, skipped=True)
+    frames_total.inc(mode="live")
+
+    # 1. Keyframes run the full-frame detector (recognition only where a track's
+    # cache is stale); in between, tracked faces are re-found inside their
+    # predicted ROI and keep their cached recognition
+    raw_detections = None
+    predicted = session.tracker.predicted_boxes()
+    if not scheduler.wants_keyframe(tier["keyframe_interval"], len(predicted), settings.roi_max_tracks):
+        try:
+            raw_detections = _redetect_in_rois(session, img, tier, predicted, scale=decoded.factor)
+        except Exception:
+            # The same frame falls back to a full keyframe
+            logger.exception("ROI re-detection failed on stream %s", session.stream_id)
+            errors_total.inc(engine="roi")
+            raw_detections = None
+    keyframe = raw_detections is None
+
+    if keyframe:
+        try:
+            raw_detections = _analyze_keyframe(session, decoded, tier, predicted)
+        except Exception:
+            logger.exception("Keyframe analysis failed on stream %s", session.stream_id)
+            errors_total.inc(engine="insightface")
+            session.last_result = None
+            return {"faceDetected": False, "totalFaces": 0, "faces": []}
+    scheduler.record(keyframe)
+
+    # 2. Prepare detections for DeepSORT
+    ds_detections = []
+    ds_embeds = []
+    
+    for i, det in enumerate(raw_detections):
+        x1, y1, x2, y2 = det["bbox"]
+        w = max(1, x2 - x1)
+        h = max(1, y2 - y1)
+        conf = det["det_score"]
+        emb = det["embedding"]
+        
+        ds_detections.append(([x1, y1, w, h], conf, f"face_{i}"))
+        ds_embeds.append(emb)
+
+    # 3. Update Tracker (Live Mode)
     try:
-        tracks = tracker_engine.update(ds_detections, img, embeds=ds_embeds)
-    except:
+        with stage_seconds.time(stage="track"):
+            tracks = session.tracker.update(ds_detections, img, embeds=ds_embeds)
+    except Exception:
+        logger.exception("Tracker update failed on stream %s", session.stream_id)
+        errors_total.inc(engine="tracker")
+        session.last_result = None
         return {"faceDetected": False, "totalFaces": 0, "faces": []}
+
+    # Smoothing state follows the tracker's track lifecycle
+    deleted_ids = session.tracker.deleted_track_ids()
+    tracks_deleted_total.inc(len(deleted_ids))
+    session.track_states.evict(deleted_ids)
+    session.recognition_cache.evict(deleted_ids)
+    session.best_crops.evict(deleted_ids)
+    session.track_states.prune()
     
-    # 5. Final Processing with Smoothing (Live Mode Only)
+    # 4. Final Processing with Smoothing (Live Mode Only)
     stable_faces = []
+    face_boxes = []
     
+    # One-to-one IoU association gives each track the index of its detection
+    with stage_seconds.time(stage="associate"):
+        assign_detections(tracks, raw_detections, iou_threshold=0.3)
+
     for track in tracks:
         track_id = track["track_id"]
-        # Heuristic match
-        best_match = None
-        max_iou = 0
-        tx1, ty1, tx2, ty2 = track["bbox"]
-        
-        for det in raw_detections:
-            dx1, dy1, dx2, dy2 = det["bbox"]
-            inter_x1 = max(tx1, dx1)
-            inter_y1 = max(ty1, dy1)
-            inter_x2 = min(tx2, dx2)
-            inter_y2 = min(ty2, dy2)
-            inter_area = max(0, inter_x2 - inter_x1) * max(0, inter_y2 - inter_y1)
-            t_area = (tx2 - tx1) * (ty2 - ty1)
-            d_area = (dx2 - dx1) * (dy2 - dy1)
-            iou = inter_area / float(t_area + d_area - inter_area) if (t_area + d_area - inter_area) > 0 else 0
-            
-            if iou > max_iou:
-                max_iou = iou
-                best_match = det
-        
-        if best_match and max_iou > 0.3:
-            # Apply Smoothing
-            age, gender, embedding = get_smoothed_demographics(
-                track_id, 
-                best_match.get("age"), 
-                best_match.get("gender"), 
-                best_match.get("embedding")
-            )
+        if track["det_index"] >= 0:
+            best_match = raw_detections[track["det_index"]]
+            # Apply Smoothing (ROI frames reuse cached values, so they add no history)
+            smoothed = None
+            if best_match.get("reused"):
+                smoothed = session.track_states.current(track_id)
+            if smoothed is None:
+                smoothed = session.track_states.update(
+                    track_id, 
+                    best_match.get("age"), 
+                    best_match.get("gender"), 
+                    best_match.get("embedding")
+                )
+                if not best_match.get("reused"):
+                    session.recognition_cache.store(track_id, best_match)
+                    if best_match.get("embedding") is not None:
+                        session.sightings[track_id] = best_match["embedding"]
+            age, gender, embedding = smoothed
+            quality = best_match.get("quality")
+            if quality is not None:
+                session.best_crops.offer(track_id, quality["score"], img, best_match["bbox"])
             
             stable_faces.append({
                 "track_id": track_id,
@@ -176,6 +487,7 @@ def process_face_pipeline(image_bytes: bytes, is_static: bool = False, **kwargs)
                 "height": float((track["bbox"][3] - track["bbox"][1]) / img.shape[0]),
                 "embedding": embedding,
                 "confidence": float(track["confidence"]),
+                "quality": quality,
                 "demographics": {
                     "age": int(age),
                     "gender": "Male" if gender == 1 else "Female",
@@ -186,12 +498,43 @@ def process_face_pipeline(image_bytes: bytes, is_static: bool = False, **kwargs)
                     "livenessScore": round(float(track["confidence"] * 0.98), 4)
                 }
             })
+            face_boxes.append(track["bbox"])
 
-    return {
+    # 5. Emotion for every tracked face from one landmarker pass
+    for face, emotion in zip(stable_faces, _emotions(img, face_boxes, session=session)):
+        face["emotions"] = emotion
+
+    faces_total.inc(len(stable_faces), mode="live")
+    session.last_result = {
         "faceDetected": len(stable_faces) > 0,
         "totalFaces": len(stable_faces),
-        "faces": stable_faces
+        "faces": stable_faces,
+        "keyframe": keyframe
     }
+    return session.last_result
+
+def analyze_frame(session, img, tier):
+    """
+    Tracker-backed analysis of an already decoded frame for a caller-owned
+    session (offline video jobs).
+    """
+    with session.lock:
+        return _process_live_frame(session, DecodedImage.from_array(img), tier)
+
+def static_cache_context(profile=None):
+    """
+    Everything besides the image that shapes a static result: the tier and
+    its thresholds, weight precisions, decode floor and optional stages.
+    """
+    name = profile or settings.static_profile
+    return json.dumps({
+        "profile": name,
+        "tier": get_profile(name),
+        "detPrecision": settings.det_precision,
+        "recPrecision": settings.rec_precision,
+        "decodeMinSide": settings.decode_min_side,
+        "emotion": settings.emotion_enabled
+    }, sort_keys=True)
 
-def detect_face(image_bytes, is_static=False):
-    return process_face_pipeline(image_bytes, is_static=is_static)
\ No newline at end of file
+def detect_face(image_bytes, is_static=False, stream_id="default", profile=None):
+    return process_face_pipeline(image_bytes, is_static=is_static, stream_id=stream_id, profile=profile)
\ No newline at end of file
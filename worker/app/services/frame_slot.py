@@ -0,0 +1,42 @@
+import asyncio
+from app.core.metrics import frames_dropped_total
+
+
+class LatestFrameSlot:
+    def __init__(self):
+        """
+        Single-slot hand-off between a socket reader and the inference loop.
+        A frame that arrives while the previous one is still waiting replaces
+        it (latest-frame-wins), so a slow worker never builds a backlog.
+        """
+        self._frame = None
+        self._seq = 0
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+            frames_dropped_total.inc(reason="stale")
+        self._frame = frame
+        self._seq = self.received
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def take(self):
+        """
+        Waits for the newest frame and returns (seq, frame), or None once closed.
+        """
+        while self._frame is None and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.closed:
+            return None
+        frame, self._frame = self._frame, None
+        return self._seq, frame
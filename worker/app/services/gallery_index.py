@@ -0,0 +1,412 @@
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _fit_centroids(sample, n_lists, iterations, rng):
+    # Spherical k-means seeded from the sample itself
+    centroids = sample[rng.choice(len(sample), size=min(n_lists, len(sample)), replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(len(centroids)):
+            members = sample[labels == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class GalleryIndex:
+    def __init__(self, dim=512, capacity=1024, approximate_threshold=50000, n_probe=8, chunk_rows=65536,
+                 list_slack=0.05, background_train=False):
+        """
+        In-memory 1:N identification index over L2-normalized embeddings.
+
+        Rows live in two segments addressed by one global row number:
+        - base: a read-only matrix (usually a memory-mapped snapshot shared
+          between processes); removals only tombstone its rows.
+        - tail: a growable float32 matrix for entries added since the base was
+          loaded; removal swaps in the last row to keep it dense.
+
+        Exact search is a matrix multiply per segment. Past
+        `approximate_threshold` entries an IVF coarse quantizer restricts each
+        query to its `n_probe` nearest lists. The inverted lists are not rebuilt
+        on every write: rows appended since the last build are scanned
+        exactly, and rows moved by updates or removals stay where they were
+        listed until more than `list_slack` of the index has changed.
+        With `background_train`, the quantizer is (re)fitted on a helper thread
+        instead of inside the search that crossed the threshold; until it is
+        ready, searches stay exact or keep the previous lists.
+        """
+        self.dim = dim
+        self.approximate_threshold = approximate_threshold
+        self.n_probe = n_probe
+        self.chunk_rows = chunk_rows
+        self.list_slack = list_slack
+        self.background_train = background_train
+        self._lock = threading.RLock()
+        self._training = None     # helper thread fitting the quantizer
+        self._train_dirty = None  # rows written while it runs
+        self._generation = 0
+        self._initial_capacity = capacity
+        self.load_base(np.zeros((0, dim), dtype=np.float32), [], [])
+
+    def load_base(self, vectors, ids, metadata, centroids=None, assignments=None):
+        """
+        Replaces the whole index with `vectors` (already normalized) as the base segment.
+        """
+        with self._lock:
+            # A fit still running on the old rows is discarded
+            self._generation += 1
+            self._training = None
+            self._train_dirty = None
+            self._base = vectors
+            self._n_base = len(ids)
+            self._base_alive = np.ones(self._n_base, dtype=bool)
+            self._dead = 0
+
+            self._tail = np.zeros((self._initial_capacity, self.dim), dtype=np.float32)
+            self._tail_size = 0
+
+            self._ids = list(ids)        # global row -> identity id (None once tombstoned)
+            self._rows = {identity_id: row for row, identity_id in enumerate(self._ids)}
+            self._metadata = {identity_id: meta or {} for identity_id, meta in zip(self._ids, metadata)}
+
+            self._centroids = centroids
+            self._assignments = np.zeros(self._n_base + self._initial_capacity, dtype=np.int32)
+            if assignments is not None:
+                self._assignments[:self._n_base] = assignments
+            elif centroids is not None:
+                self._assign_rows(0, self._n_base)
+            self._trained_size = len(self._rows) if centroids is not None else 0
+            self._list_order = None
+            self._list_offsets = None
+            self._listed_rows = 0
+            self._list_moves = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, identity_id):
+        return identity_id in self._rows
+
+    def _n_rows(self):
+        return self._n_base + self._tail_size
+
+    def _row_vectors(self, rows):
+        rows = np.asarray(rows)
+        if not self._n_base:
+            return self._tail[rows]
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        in_base = rows < self._n_base
+        out[in_base] = self._base[rows[in_base]]
+        out[~in_base] = self._tail[rows[~in_base] - self._n_base]
+        return out
+
+    def _ensure_capacity(self, needed):
+        if needed <= self._tail.shape[0]:
+            return
+        capacity = max(needed, self._tail.shape[0] * 2)
+        tail = np.zeros((capacity, self.dim), dtype=np.float32)
+        tail[:self._tail_size] = self._tail[:self._tail_size]
+        assignments = np.zeros(self._n_base + capacity, dtype=np.int32)
+        assignments[:self._n_rows()] = self._assignments[:self._n_rows()]
+        self._tail, self._assignments = tail, assignments
+
+    def upsert(self, identity_id, embedding, metadata=None):
+        self.upsert_many([(identity_id, embedding, metadata)])
+
+    def upsert_many(self, items):
+        """
+        Adds or replaces (identity_id, embedding, metadata) entries.
+        """
+        items = list(items)
+        if not items:
+            return 0
+        vectors = self.validate([embedding for _, embedding, _ in items])
+
+        with self._lock:
+            self._ensure_capacity(self._tail_size + len(items))
+            for (identity_id, _, metadata), vector in zip(items, vectors):
+                row = self._rows.get(identity_id)
+                if row is not None and row < self._n_base:
+                    # Base rows are read-only: tombstone and re-add in the tail
+                    self._tombstone(row)
+                    row = None
+                if row is None:
+                    row = self._n_base + self._tail_size
+                    self._tail_size += 1
+                    self._rows[identity_id] = row
+                    self._ids.append(identity_id)
+                self._tail[row - self._n_base] = vector
+                if self._train_dirty is not None:
+                    self._train_dirty.add(row)
+                if self._centroids is not None:
+                    assignment = int(np.argmax(self._centroids @ vector))
+                    if row < self._listed_rows and assignment != self._assignments[row]:
+                        # Still listed under its old list until the next rebuild
+                        self._list_moves += 1
+                    self._assignments[row] = assignment
+                if metadata is not None or identity_id not in self._metadata:
+                    self._metadata[identity_id] = metadata or {}
+        return len(items)
+
+    def validate(self, embeddings):
+        vectors = normalize_rows(embeddings)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}")
+        return vectors
+
+    def _tombstone(self, row):
+        self._base_alive[row] = False
+        self._ids[row] = None
+        self._dead += 1
+        self._list_order = None
+
+    def remove(self, identity_id):
+        with self._lock:
+            row = self._rows.pop(identity_id, None)
+            if row is None:
+                return False
+            if row < self._n_base:
+                self._tombstone(row)
+            else:
+                last = self._n_rows() - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._tail[row - self._n_base] = self._tail[last - self._n_base]
+                    self._assignments[row] = self._assignments[last]
+                    self._ids[row] = moved_id
+                    self._rows[moved_id] = row
+                    if self._train_dirty is not None:
+                        self._train_dirty.add(row)
+                self._ids.pop()
+                self._tail_size -= 1
+                # The lists may still name the vacated last row; searches drop it
+                self._list_moves += 1
+                self._listed_rows = min(self._listed_rows, self._n_rows())
+            self._metadata.pop(identity_id, None)
+            return True
+
+    def _alive_rows(self):
+        rows = np.arange(self._n_rows())
+        if self._dead:
+            alive = np.ones(len(rows), dtype=bool)
+            alive[:self._n_base] = self._base_alive
+            rows = rows[alive]
+        return rows
+
+    def train(self, n_lists=None, iterations=10, sample_size=20000, seed=0):
+        """
+        Fits the IVF coarse quantizer with spherical k-means on a sample of rows.
+        """
+        with self._lock:
+            rows = self._alive_rows()
+            if len(rows) == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(len(rows))))
+            rng = np.random.default_rng(seed)
+            sample = self._row_vectors(np.sort(rng.choice(rows, size=min(len(rows), sample_size), replace=False)))
+            self._centroids = _fit_centroids(sample, n_lists, iterations, rng)
+            self._assign_rows(0, self._n_rows())
+            self._trained_size = len(rows)
+
+    def _start_training(self, iterations=10, sample_size=20000, seed=0):
+        # Called with the lock held; the sample is copied out so k-means runs unlocked
+        rows = self._alive_rows()
+        rng = np.random.default_rng(seed)
+        sample = self._row_vectors(np.sort(rng.choice(rows, size=min(len(rows), sample_size), replace=False)))
+        n_lists = max(1, int(np.sqrt(len(rows))))
+        self._train_dirty = set()
+        self._training = threading.Thread(
+            target=self._train_in_background, args=(sample, n_lists, iterations, rng, len(rows), self._generation),
+            name="gallery-index-train", daemon=True
+        )
+        self._training.start()
+
+    def _train_in_background(self, sample, n_lists, iterations, rng, trained_size, generation):
+        try:
+            centroids = _fit_centroids(sample, n_lists, iterations, rng)
+            # Rows are copied out a chunk at a time, so writers only wait for a memcpy
+            step = max(1, min(self.chunk_rows, 4096))
+            parts, start = [], 0
+            while True:
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    stop = min(start + step, self._n_rows())
+                    if start >= stop:
+                        break
+                    vectors = self._row_vectors(np.arange(start, stop))
+                parts.append(np.argmax(vectors @ centroids.T, axis=1))
+                start = stop
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+                n_rows = self._n_rows()
+                assigned = min(start, n_rows)
+                self._centroids = centroids
+                if assigned:
+                    self._assignments[:assigned] = np.concatenate(parts)[:assigned]
+                # Rows appended or rewritten since their chunk was copied
+                self._assign_rows(assigned, n_rows)
+                dirty = np.fromiter((row for row in self._train_dirty if row < assigned), dtype=np.int64)
+                if len(dirty):
+                    self._assignments[dirty] = np.argmax(self._row_vectors(dirty) @ centroids.T, axis=1)
+                self._trained_size = trained_size
+                self._list_order = None
+        except Exception:
+            logger.exception("Background IVF training failed")
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._training = None
+                    self._train_dirty = None
+
+    def _assign_rows(self, start, stop):
+        for chunk_start in range(start, stop, self.chunk_rows):
+            chunk_stop = min(chunk_start + self.chunk_rows, stop)
+            vectors = self._row_vectors(np.arange(chunk_start, chunk_stop))
+            self._assignments[chunk_start:chunk_stop] = np.argmax(vectors @ self._centroids.T, axis=1)
+        self._list_order = None
+
+    def _inverted_lists(self):
+        n_rows = self._n_rows()
+        changed = self._list_moves + n_rows - self._listed_rows
+        if self._list_order is None or changed > max(1024, self.list_slack * n_rows):
+            rows = self._alive_rows()
+            assignments = self._assignments[rows]
+            order = np.argsort(assignments, kind="stable")
+            self._list_order = rows[order]
+            self._list_offsets = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+            self._listed_rows = n_rows
+            self._list_moves = 0
+        return self._list_order, self._list_offsets
+
+    def _use_approximate(self):
+        if len(self._rows) < self.approximate_threshold:
+            return False
+        # (Re)train once the gallery has doubled since the last fit
+        if self._centroids is None or len(self._rows) > 2 * self._trained_size:
+            if not self.background_train:
+                self.train()
+            elif self._training is None:
+                self._start_training()
+        return self._centroids is not None
+
+    def _exact_scores(self, queries):
+        """
+        Scores every row; float32 bases are multiplied in place, compact
+        (e.g. float16) bases are widened chunk by chunk.
+        """
+        parts = []
+        if self._n_base:
+            if self._base.dtype == np.float32:
+                parts.append(queries @ self._base.T)
+            else:
+                for start in range(0, self._n_base, self.chunk_rows):
+                    chunk = np.asarray(self._base[start:start + self.chunk_rows], dtype=np.float32)
+                    parts.append(queries @ chunk.T)
+        if self._tail_size:
+            parts.append(queries @ self._tail[:self._tail_size].T)
+        scores = np.hstack(parts)
+        if self._dead:
+            scores[:, :self._n_base][:, ~self._base_alive] = -np.inf
+        return scores
+
+    def search(self, queries, k=5, min_score=None, approximate=None):
+        """
+        Top-k cosine matches for each query embedding.
+        Returns one list of {"id", "score", "metadata"} per query, best first.
+        """
+        queries = normalize_rows(queries)
+        if queries.shape[0] == 0:
+            return []
+
+        with self._lock:
+            if not self._rows or queries.shape[1] != self.dim:
+                return [[] for _ in range(queries.shape[0])]
+
+            if approximate is None:
+                use_ivf = self._use_approximate()
+            else:
+                use_ivf = approximate
+                if use_ivf and self._centroids is None:
+                    self.train()
+
+            if use_ivf:
+                order, offsets = self._inverted_lists()
+                n_rows = self._n_rows()
+                unlisted = np.arange(self._listed_rows, n_rows)
+                probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :self.n_probe]
+                scored = []
+                for probe, query in zip(probes, queries):
+                    rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe] + [unlisted])
+                    if self._list_moves:
+                        # The lists may still name rows vacated since the last build
+                        rows = rows[rows < n_rows]
+                    scored.append((rows, self._row_vectors(rows) @ query))
+                # Rows moved since the last build can be listed twice
+                duplicates = self._list_moves > 0
+            else:
+                rows = np.arange(self._n_rows())
+                scored = [(rows, scores) for scores in self._exact_scores(queries)]
+                duplicates = False
+
+            return [self._top_k(rows, scores, k, min_score, duplicates) for rows, scores in scored]
+
+    def _top_k(self, rows, scores, k, min_score, duplicates=False):
+        if len(scores) == 0:
+            return []
+        # A row is listed at most twice, so 2k candidates always hold k distinct rows
+        n = min(2 * k if duplicates else k, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        seen = set()
+        for i in top:
+            score = float(scores[i])
+            if not np.isfinite(score) or (min_score is not None and score < min_score) or len(matches) == k:
+                break
+            if rows[i] in seen:
+                continue
+            seen.add(rows[i])
+            identity_id = self._ids[rows[i]]
+            matches.append({"id": identity_id, "score": round(score, 4), "metadata": self._metadata.get(identity_id, {})})
+        return matches
+
+    def export(self):
+        """
+        Dense copy of the live entries: (vectors, ids, metadata, centroids, assignments).
+        """
+        with self._lock:
+            rows = self._alive_rows()
+            ids = [self._ids[row] for row in rows]
+            assignments = self._assignments[rows].copy() if self._centroids is not None else None
+            return (self._row_vectors(rows), ids, [self._metadata.get(i, {}) for i in ids],
+                    self._centroids, assignments)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._rows),
+                "dim": self.dim,
+                "baseRows": self._n_base,
+                "tailRows": self._tail_size,
+                "tombstones": self._dead,
+                "mapped": isinstance(self._base, np.memmap),
+                "approximate": self._centroids is not None and len(self._rows) >= self.approximate_threshold,
+                "lists": 0 if self._centroids is None else len(self._centroids),
+                "nProbe": self.n_probe
+            }
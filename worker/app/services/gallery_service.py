@@ -0,0 +1,23 @@
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.gallery_index import GalleryIndex
+from app.services.gallery_store import GalleryStore
+
+gallery_index = GalleryIndex(approximate_threshold=settings.gallery_ann_threshold)
+
+# With GALLERY_DIR set the index is backed by a memory-mapped snapshot + journal;
+# both objects expose the same upsert/remove/search/stats surface.
+gallery_store = None
+if settings.gallery_dir:
+    gallery_store = GalleryStore(gallery_index, settings.gallery_dir, dtype=settings.gallery_dtype)
+
+gallery = gallery_store or gallery_index
+metrics.gauge("gallery_identities", "Identities in the in-worker gallery.", callback=lambda: len(gallery))
+
+def open_gallery():
+    if gallery_store is not None:
+        gallery_store.open()
+
+def close_gallery():
+    if gallery_store is not None:
+        gallery_store.close()
@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single process, no cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# op, id length, metadata length, vector dim
+RECORD = struct.Struct("<BHII")
+OP_UPSERT = 1
+OP_REMOVE = 2
+
+
+class GalleryStore:
+    def __init__(self, index, directory, dtype="float32", compact_after=5000, compact_interval=30.0):
+        """
+        Persists a GalleryIndex as a memory-mapped snapshot plus an append-only journal.
+
+        Layout of `directory` (generation G is named in manifest.json):
+            embeddings.G.npy  contiguous normalized vectors, np.load(mmap_mode="r")
+            ids.G.json        row -> id table and metadata
+            ivf.G.npz         IVF centroids/assignments, when trained
+            journal.G.bin     upserts/removals made after snapshot G
+
+        Every write goes to the journal first and reaches the index by replaying
+        it, so several uvicorn processes over the same directory converge and
+        share the snapshot's page cache instead of each holding a copy.
+        A background thread folds the journal into a new snapshot generation.
+        """
+        self.index = index
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.compact_after = compact_after
+        self.compact_interval = compact_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        self._lock_path = os.path.join(directory, "gallery.lock")
+
+        self._sync_lock = threading.RLock()
+        self.generation = -1
+        self._manifest_mtime = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self.load_seconds = 0.0
+
+        self._stop = threading.Event()
+        self._compactor = None
+
+    # ---- files -------------------------------------------------------------
+
+    def _path(self, stem, generation, ext):
+        return os.path.join(self.directory, f"{stem}.{generation}.{ext}")
+
+    def _journal_path(self, generation=None):
+        return self._path("journal", self.generation if generation is None else generation, "bin")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """
+        Writers share the lock; compaction takes it exclusively so no append
+        lands in a journal generation that is being retired.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    # ---- loading -----------------------------------------------------------
+
+    def open(self, background_compaction=True):
+        with self._file_lock(exclusive=True):
+            manifest = self._read_manifest()
+            if manifest is None:
+                self._write_snapshot(0, *self.index.export())
+            else:
+                self._truncate_torn_record(manifest["generation"])
+        self._reload()
+        if background_compaction:
+            self._compactor = threading.Thread(target=self._compact_loop, name="gallery-compactor", daemon=True)
+            self._compactor.start()
+        return self
+
+    def _truncate_torn_record(self, generation):
+        """
+        Cuts a record left half-written by a crashed writer off the journal, so
+        later appends do not land behind it. Needs the exclusive lock: live
+        writers finish their record before releasing the shared one.
+        """
+        path = self._journal_path(generation)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset + RECORD.size <= len(data):
+            _, id_len, meta_len, dim = RECORD.unpack_from(data, offset)
+            end = offset + RECORD.size + id_len + meta_len + dim * 4
+            if end > len(data):
+                break
+            offset = end
+        if offset < len(data):
+            logger.warning("Truncating %d torn bytes from %s", len(data) - offset, path)
+            os.truncate(path, offset)
+
+    def _reload(self):
+        started = time.perf_counter()
+        with self._sync_lock:
+            manifest = self._read_manifest()
+            generation = manifest["generation"]
+
+            vectors = np.load(self._path("embeddings", generation, "npy"), mmap_mode="r")
+            with open(self._path("ids", generation, "json")) as f:
+                table = json.load(f)
+
+            centroids = assignments = None
+            ivf_path = self._path("ivf", generation, "npz")
+            if os.path.exists(ivf_path):
+                with np.load(ivf_path) as ivf:
+                    centroids, assignments = ivf["centroids"], ivf["assignments"]
+
+            self.index.load_base(vectors, table["ids"], table["metadata"], centroids, assignments)
+            self.generation = generation
+            self._manifest_mtime = os.stat(self._manifest_path).st_mtime_ns
+            self._journal_offset = 0
+            self._journal_records = 0
+            self._replay()
+        self.load_seconds = time.perf_counter() - started
+
+    def _replay(self):
+        """
+        Applies journal records appended since the last call (by any process).
+        """
+        try:
+            with open(self._journal_path(), "rb") as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        upserts = []
+        while offset + RECORD.size <= len(data):
+            op, id_len, meta_len, dim = RECORD.unpack_from(data, offset)
+            end = offset + RECORD.size + id_len + meta_len + dim * 4
+            if end > len(data):
+                break  # record still being written; pick it up next time
+            cursor = offset + RECORD.size
+            identity_id = data[cursor:cursor + id_len].decode("utf-8")
+            cursor += id_len
+            metadata = json.loads(data[cursor:cursor + meta_len]) if meta_len else None
+            cursor += meta_len
+
+            if op == OP_UPSERT:
+                upserts.append((identity_id, np.frombuffer(data, dtype="<f4", count=dim, offset=cursor), metadata))
+            else:
+                # Keep ordering: flush pending upserts before a removal
+                self.index.upsert_many(upserts)
+                upserts = []
+                self.index.remove(identity_id)
+            offset = end
+            self._journal_records += 1
+
+        self.index.upsert_many(upserts)
+        self._journal_offset += offset
+
+    def sync(self):
+        """
+        Cheap catch-up before a read: two stat calls when nothing changed.
+        """
+        with self._sync_lock:
+            try:
+                mtime = os.stat(self._manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime != self._manifest_mtime:
+                manifest = self._read_manifest()
+                if manifest and manifest["generation"] != self.generation:
+                    self._reload()
+                    return
+                self._manifest_mtime = mtime
+            try:
+                size = os.stat(self._journal_path()).st_size
+            except FileNotFoundError:
+                return
+            if size > self._journal_offset:
+                self._replay()
+
+    # ---- writes ------------------------------------------------------------
+
+    def _append(self, records):
+        with self._file_lock(exclusive=False):
+            # A compaction may have rotated the journal since our last look
+            self.sync()
+            fd = os.open(self._journal_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(records))
+            finally:
+                os.close(fd)
+        self.sync()
+
+    @staticmethod
+    def _record(op, identity_id, vector=None, metadata=None):
+        id_bytes = identity_id.encode("utf-8")
+        meta_bytes = json.dumps(metadata).encode("utf-8") if metadata is not None else b""
+        vec_bytes = vector.astype("<f4").tobytes() if vector is not None else b""
+        dim = len(vector) if vector is not None else 0
+        return RECORD.pack(op, len(id_bytes), len(meta_bytes), dim) + id_bytes + meta_bytes + vec_bytes
+
+    def upsert(self, identity_id, embedding, metadata=None):
+        return self.upsert_many([(identity_id, embedding, metadata)])
+
+    def upsert_many(self, items):
+        items = list(items)
+        if not items:
+            return 0
+        vectors = self.index.validate([embedding for _, embedding, _ in items])
+        self._append([
+            self._record(OP_UPSERT, identity_id, vector, metadata)
+            for (identity_id, _, metadata), vector in zip(items, vectors)
+        ])
+        return len(items)
+
+    def remove(self, identity_id):
+        self.sync()
+        if identity_id not in self.index:
+            return False
+        self._append([self._record(OP_REMOVE, identity_id)])
+        return True
+
+    def search(self, queries, k=5, min_score=None, approximate=None):
+        self.sync()
+        return self.index.search(queries, k, min_score, approximate)
+
+    def __len__(self):
+        return len(self.index)
+
+    # ---- compaction --------------------------------------------------------
+
+    def _write_snapshot(self, generation, vectors, ids, metadata, centroids, assignments):
+        # Store rows grouped by IVF list so each list is a contiguous run of pages
+        if assignments is not None and len(ids):
+            order = np.argsort(assignments, kind="stable")
+            vectors, assignments = vectors[order], assignments[order]
+            ids = [ids[i] for i in order]
+            metadata = [metadata[i] for i in order]
+
+        def atomic(path, write):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+
+        atomic(self._path("embeddings", generation, "npy"),
+               lambda f: np.save(f, np.ascontiguousarray(vectors, dtype=self.dtype)))
+        atomic(self._path("ids", generation, "json"),
+               lambda f: f.write(json.dumps({"ids": ids, "metadata": metadata}).encode("utf-8")))
+        if centroids is not None:
+            atomic(self._path("ivf", generation, "npz"),
+                   lambda f: np.savez(f, centroids=centroids, assignments=assignments))
+        open(self._journal_path(generation), "ab").close()
+        atomic(self._manifest_path, lambda f: f.write(json.dumps({
+            "generation": generation,
+            "count": len(ids),
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else self.index.dim,
+            "dtype": self.dtype.name,
+            "createdAt": time.time()
+        }).encode("utf-8")))
+
+    def compact(self):
+        """
+        Folds the journal into snapshot G+1. Files of G-1 are removed; G stays
+        one generation so processes still reading it can catch up.
+        """
+        with self._file_lock(exclusive=True):
+            self.sync()
+            if self._journal_records == 0:
+                return False
+            previous = self.generation
+            self._write_snapshot(previous + 1, *self.index.export())
+
+        for stem, ext in (("embeddings", "npy"), ("ids", "json"), ("ivf", "npz"), ("journal", "bin")):
+            try:
+                os.remove(self._path(stem, previous - 1, ext))
+            except FileNotFoundError:
+                pass
+
+        # Swap our own process onto the freshly mapped snapshot
+        self.sync()
+        return True
+
+    def _compact_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                if self._journal_records >= self.compact_after:
+                    self.compact()
+            except Exception:
+                logger.exception("Gallery compaction failed")
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self):
+        self.sync()
+        return {
+            **self.index.stats(),
+            "generation": self.generation,
+            "journalRecords": self._journal_records,
+            "loadSeconds": round(self.load_seconds, 3),
+            "dtype": self.dtype.name
+        }
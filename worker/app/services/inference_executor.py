@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from app.core.config import settings
+from app.core.metrics import metrics, stage_seconds
+from app.core.profiler import request_profiler, sample_call
+
+rejected_total = metrics.counter("inference_rejected_total", "Calls rejected because the admission queue was full.")
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the admission queue is saturated and the request must be rejected.
+    """
+
+
+def _timed_call(fn, args, kwargs, sample_interval=None):
+    # time.monotonic is system-wide, so stamps stay comparable across worker processes
+    started = time.monotonic()
+    stacks = None
+    if sample_interval:
+        # Sampled inside the worker, so profiling works in process mode too
+        result, stacks = sample_call(fn, args, kwargs, sample_interval)
+    else:
+        result = fn(*args, **kwargs)
+    return result, started, time.monotonic(), stacks
+
+
+class InferenceExecutor:
+    def __init__(self, mode="thread", max_workers=2, max_queue=8):
+        """
+        Runs blocking inference off the event loop on a bounded worker pool.
+        At most `max_workers` calls execute and `max_queue` wait; anything beyond
+        that is rejected with QueueFullError so callers can apply back-pressure.
+        In process mode, calls that need this process's state (live stream
+        sessions) go through run_local, a thread pool under the same admission.
+        """
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.capacity = self.max_workers + self.max_queue
+
+        if mode == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            self.local_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference-local")
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+            self.local_pool = self.pool
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                rejected_total.inc()
+                raise QueueFullError(f"Inference queue full ({self._pending}/{self.capacity})")
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Executes fn(*args, **kwargs) on the pool.
+        Returns (result, timing) where timing splits queue wait from compute time.
+        """
+        return await self._run(self.pool, fn, args, kwargs)
+
+    async def run_local(self, fn, *args, **kwargs):
+        """
+        Like run, but always in this process, so every frame of a stream meets
+        the same tracker session whatever INFERENCE_MODE is.
+        """
+        return await self._run(self.local_pool, fn, args, kwargs)
+
+    async def _run(self, pool, fn, args, kwargs):
+        self._admit()
+        sample_interval = request_profiler.interval_ms / 1000.0 if request_profiler.enabled else None
+        try:
+            loop = asyncio.get_running_loop()
+            submitted = time.monotonic()
+            result, started, finished, stacks = await loop.run_in_executor(
+                pool, partial(_timed_call, fn, args, kwargs, sample_interval)
+            )
+        finally:
+            self._release()
+
+        timing = {
+            "queueMs": round(max(0.0, started - submitted) * 1000, 2),
+            "computeMs": round((finished - started) * 1000, 2),
+            "totalMs": round((time.monotonic() - submitted) * 1000, 2)
+        }
+        stage_seconds.observe(max(0.0, started - submitted), stage="queue")
+        if stacks is not None:
+            request_profiler.record(getattr(fn, "__name__", repr(fn)), timing, stacks)
+        return result, timing
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "pending": self._pending,
+                "capacity": self.capacity,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.local_pool is not self.pool:
+            self.local_pool.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor(
+    mode=settings.inference_mode,
+    max_workers=settings.inference_workers,
+    max_queue=settings.inference_max_queue
+)
+
+metrics.gauge("inference_pending", "Inference calls running or waiting for a worker.",
+              callback=lambda: inference_executor.stats()["pending"])
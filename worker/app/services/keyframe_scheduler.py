@@ -0,0 +1,35 @@
+class KeyframeScheduler:
+    def __init__(self):
+        """
+        Decides, per stream, whether a frame gets a full detector pass (keyframe)
+        or only ROI re-detection around the tracker's predicted boxes.
+        """
+        self.frames_since_keyframe = 0
+        self.force_next = True
+        self.keyframes = 0
+        self.roi_frames = 0
+
+    def wants_keyframe(self, interval, live_tracks, max_roi_tracks):
+        if interval <= 1 or self.force_next or live_tracks == 0:
+            return True
+        # Beyond this many faces, one full pass is cheaper than per-face ROI passes
+        if live_tracks > max_roi_tracks:
+            return True
+        return self.frames_since_keyframe + 1 >= interval
+
+    def record(self, keyframe):
+        if keyframe:
+            self.keyframes += 1
+            self.frames_since_keyframe = 0
+        else:
+            self.roi_frames += 1
+            self.frames_since_keyframe += 1
+        self.force_next = False
+
+    def stats(self):
+        total = self.keyframes + self.roi_frames
+        return {
+            "keyframes": self.keyframes,
+            "roiFrames": self.roi_frames,
+            "keyframeRatio": round(self.keyframes / total, 3) if total else 0.0
+        }
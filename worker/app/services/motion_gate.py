@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, thumb_side=160, pixel_delta=15, min_changed=2, max_skip=15):
+        """
+        Per-stream change detector in front of the networks.
+        Each frame is reduced to a blurred grey thumbnail (`thumb_side` px on
+        its long side) and compared with the thumbnail of the last analysed
+        frame; it counts as unchanged when fewer than `min_changed` thumbnail
+        pixels moved by more than `pixel_delta` grey levels. Comparing against
+        the last analysed frame, not the previous one, lets slow changes add
+        up, and at most `max_skip` frames in a row are skipped so a face that
+        entered without tripping the threshold is still found. `max_skip` 0
+        disables the gate.
+        """
+        self.thumb_side = thumb_side
+        self.pixel_delta = pixel_delta
+        self.min_changed = min_changed
+        self.max_skip = max_skip
+
+        self._reference = None
+        self._consecutive = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def _thumbnail(self, img):
+        height, width = img.shape[:2]
+        scale = self.thumb_side / max(height, width)
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        grey = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        thumb = cv2.resize(grey, size, interpolation=cv2.INTER_AREA)
+        # Smooths sensor noise and JPEG blocking so they do not count as motion
+        return cv2.GaussianBlur(thumb, (3, 3), 0)
+
+    def should_skip(self, img):
+        """
+        True when `img` can reuse the last analysed frame's result.
+        A False answer makes `img` the new reference.
+        """
+        self.frames += 1
+        if self.max_skip <= 0:
+            return False
+        thumb = self._thumbnail(img)
+        reference = self._reference
+        if (reference is not None and reference.shape == thumb.shape
+                and self._consecutive < self.max_skip):
+            changed = int(np.count_nonzero(cv2.absdiff(thumb, reference) > self.pixel_delta))
+            if changed < self.min_changed:
+                self._consecutive += 1
+                self.skipped += 1
+                return True
+        self._reference = thumb
+        self._consecutive = 0
+        return False
+
+    def reset(self):
+        # The next frame is analysed whatever it looks like
+        self._reference = None
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skipRatio": round(self.skipped / self.frames, 3) if self.frames else 0.0
+        }
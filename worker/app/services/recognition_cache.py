@@ -0,0 +1,77 @@
+import time
+from app.utils.face_quality import yaw_pitch
+
+
+class RecognitionCache:
+    def __init__(self, refresh_seconds=2.0, size_growth=1.3, score_gain=0.1, yaw_change=0.25):
+        """
+        Decides, per track of one stream, whether the last recognition pass
+        (embedding + genderage) can stand in for this frame's detection.
+        A track is re-recognised once its entry is `refresh_seconds` old, the
+        face area grew by `size_growth`, the detector score rose by `score_gain`,
+        or the head turned by more than `yaw_change` (keypoint yaw proxy).
+        The cached values themselves are the track's smoothed state.
+        """
+        self.refresh_seconds = refresh_seconds
+        self.size_growth = size_growth
+        self.score_gain = score_gain
+        self.yaw_change = yaw_change
+
+        self._entries = {}  # track_id -> (refreshed_at, area, det_score, yaw)
+        self.hits = 0
+        self.refreshes = {"new": 0, "age": 0, "size": 0, "score": 0, "pose": 0}
+
+    @staticmethod
+    def _area(face):
+        x1, y1, x2, y2 = face["bbox"]
+        return max(1, x2 - x1) * max(1, y2 - y1)
+
+    @staticmethod
+    def _yaw(face):
+        kps = face.get("kps")
+        return yaw_pitch(kps)[0] if kps is not None else 0.0
+
+    def refresh_reason(self, track_id, face):
+        """
+        None when the cached recognition for `track_id` is still good for `face`,
+        otherwise why it must be recomputed.
+        """
+        entry = self._entries.get(track_id)
+        if entry is None or self.refresh_seconds <= 0:
+            return "new"
+        refreshed_at, area, det_score, yaw = entry
+        if time.monotonic() - refreshed_at >= self.refresh_seconds:
+            return "age"
+        if self._area(face) >= area * self.size_growth:
+            return "size"
+        if face["det_score"] >= det_score + self.score_gain:
+            return "score"
+        if abs(self._yaw(face) - yaw) > self.yaw_change:
+            return "pose"
+        return None
+
+    def record_hit(self):
+        self.hits += 1
+
+    def record_refresh(self, reason):
+        self.refreshes[reason] += 1
+
+    def store(self, track_id, face):
+        self._entries[track_id] = (time.monotonic(), self._area(face), face["det_score"], self._yaw(face))
+
+    def evict(self, track_ids):
+        for track_id in track_ids:
+            self._entries.pop(track_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        refreshed = sum(self.refreshes.values())
+        total = self.hits + refreshed
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "refreshes": dict(self.refreshes),
+            "hitRatio": round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+result_cache_total = metrics.counter("result_cache_total", "Static result cache lookups.", labels=("result",))
+
+
+def _copy(result):
+    # Callers annotate faces (e.g. gallery matches); cached entries must not see that
+    return dict(result, faces=[dict(face) for face in result.get("faces", [])])
+
+
+class ResultCache:
+    def __init__(self, max_bytes, disk_dir="", disk_max_bytes=0):
+        """
+        Content-addressed cache of static analysis results.
+        Entries are keyed by a hash of the image bytes plus a context string
+        (model tier, thresholds, precisions) and kept in an LRU bounded by
+        `max_bytes` of pickled size. With `disk_dir`, entries evicted from
+        memory are spilled there (up to `disk_max_bytes`) and promoted back
+        on their next hit.
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries = OrderedDict()  # key -> (result, size)
+        self._bytes = 0
+        self._disk = OrderedDict()  # key -> size, oldest first
+        self._disk_bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, content, context):
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{self._generation}|{context}|".encode("utf-8"))
+        h.update(content)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _load_disk_index(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                result_cache_total.inc(result="hit")
+                return _copy(entry[0])
+            on_disk = self._disk.pop(key, None)
+            if on_disk is not None:
+                self._disk_bytes -= on_disk
+
+        if on_disk is not None:
+            try:
+                path = self._path(key)
+                with open(path, "rb") as f:
+                    payload = f.read()
+                os.remove(path)
+                result = pickle.loads(payload)
+            except Exception:
+                logger.exception("Dropping unreadable result cache file for %s", key)
+            else:
+                self._insert(key, result, len(payload))
+                with self._lock:
+                    self.disk_hits += 1
+                result_cache_total.inc(result="disk_hit")
+                return _copy(result)
+
+        with self._lock:
+            self.misses += 1
+        result_cache_total.inc(result="miss")
+        return None
+
+    def put(self, key, result):
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        self._insert(key, _copy(result), len(payload))
+
+    def _insert(self, key, result, size):
+        spilled = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                old_key, (old_result, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                spilled.append((old_key, old_result))
+        if self.disk_dir and self.disk_max_bytes > 0:
+            for old_key, old_result in spilled:
+                self._spill(old_key, old_result)
+
+    def _spill(self, key, result):
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._path(key)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(payload)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            logger.exception("Could not spill result cache entry %s", key)
+            return
+        stale = []
+        with self._lock:
+            self._disk[key] = len(payload)
+            self._disk_bytes += len(payload)
+            while self._disk_bytes > self.disk_max_bytes and self._disk:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                stale.append(old_key)
+        for old_key in stale:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def invalidate(self):
+        """
+        Forgets every result, in memory and on disk. Keys computed before the
+        call no longer match anything, so in-flight misses cannot resurrect them.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            stale = list(self._disk)
+            self._disk.clear()
+            self._disk_bytes = 0
+        for key in stale:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        return len(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "diskEntries": len(self._disk),
+                "diskBytes": self._disk_bytes,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRatio": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "generation": self._generation
+            }
+
+
+static_results = ResultCache(
+    max_bytes=settings.result_cache_mb * 1024 * 1024,
+    disk_dir=settings.result_cache_dir,
+    disk_max_bytes=settings.result_cache_disk_mb * 1024 * 1024
+)
+metrics.gauge("result_cache_bytes", "Bytes of static results held in memory.", callback=lambda: static_results.stats()["bytes"])
+metrics.gauge("result_cache_entries", "Static results held in memory.", callback=lambda: len(static_results))
+# Reloaded models may answer differently
+model_registry.on_reset(lambda name: static_results.invalidate())
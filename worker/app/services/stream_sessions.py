@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+from app.engines.tracker_engine import TrackerEngine
+from app.services.track_state_store import TrackStateStore
+from app.services.keyframe_scheduler import KeyframeScheduler
+from app.services.recognition_cache import RecognitionCache
+from app.services.best_crop_store import BestCropStore
+from app.services.motion_gate import MotionGate
+from app.core.config import settings
+
+
+class StreamSession:
+    def __init__(self, stream_id, tracker_kwargs):
+        """
+        Tracking context for one camera feed: its own DeepSORT instance and
+        smoothing state, guarded by a lock so frames of a stream apply in order.
+        """
+        self.stream_id = stream_id
+        self.tracker = TrackerEngine(**tracker_kwargs)
+        self.track_states = TrackStateStore()
+        self.scheduler = KeyframeScheduler()
+        self.recognition_cache = RecognitionCache(refresh_seconds=settings.recognition_refresh_ms / 1000.0)
+        self.best_crops = BestCropStore()
+        self.motion = MotionGate(
+            thumb_side=settings.motion_thumb_side,
+            pixel_delta=settings.motion_pixel_delta,
+            min_changed=settings.motion_min_changed,
+            max_skip=settings.motion_max_skip
+        )
+        # Last analysed result, answered again while the motion gate sees no change
+        self.last_result = None
+        # track_id -> embedding recognised on the last frame (not smoothed, not reused)
+        self.sightings = {}
+        # VIDEO-mode emotion landmarker, created on the first frame that needs it
+        self.emotion = None
+        # Model tier name; None means the configured LIVE_PROFILE
+        self.profile = None
+        self.lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+        self.frames = 0
+        self.closed = False
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+        self.frames += 1
+
+    def close(self):
+        """
+        Releases native resources once the session is dropped. Waits for a
+        frame in flight; frames after this use the shared still-image models.
+        """
+        with self.lock:
+            self.closed = True
+            if self.emotion is not None:
+                self.emotion.close()
+                self.emotion = None
+
+
+class StreamSessionManager:
+    def __init__(self, idle_timeout=300, max_sessions=64, tracker_kwargs=None):
+        """
+        Owns one StreamSession per stream_id.
+        Sessions idle longer than `idle_timeout` seconds are evicted, and when
+        `max_sessions` is reached the least recently used session makes room.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max(1, max_sessions)
+        self.tracker_kwargs = tracker_kwargs or {}
+
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def get(self, stream_id):
+        with self._lock:
+            dropped = self._evict_idle()
+
+            session = self._sessions.get(stream_id)
+            if session is not None:
+                self._sessions.move_to_end(stream_id)
+            else:
+                while len(self._sessions) >= self.max_sessions:
+                    dropped.append(self._sessions.popitem(last=False)[1])
+                    self._evicted += 1
+                session = StreamSession(stream_id, self.tracker_kwargs)
+                self._sessions[stream_id] = session
+
+            session.touch()
+        # Outside the manager lock: closing waits for the dropped stream's frame in flight
+        for old in dropped:
+            old.close()
+        return session
+
+    def find(self, stream_id):
+        """
+        The live session for `stream_id` without creating or touching it, or None.
+        """
+        with self._lock:
+            return self._sessions.get(stream_id)
+
+    def close(self, stream_id):
+        with self._lock:
+            session = self._sessions.pop(stream_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _evict_idle(self):
+        # OrderedDict is kept in recency order, so idle sessions sit at the front
+        cutoff = time.monotonic() - self.idle_timeout
+        dropped = []
+        while self._sessions:
+            stream_id, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            dropped.append(self._sessions.pop(stream_id))
+            self._evicted += 1
+        return dropped
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def track_state_count(self):
+        with self._lock:
+            return sum(len(session.track_states) for session in self._sessions.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "liveSessions": len(self._sessions),
+                "maxSessions": self.max_sessions,
+                "evicted": self._evicted,
+                "streams": {
+                    stream_id: {
+                        "frames": session.frames,
+                        "profile": session.profile,
+                        "trackStates": session.track_states.stats(),
+                        "scheduling": session.scheduler.stats(),
+                        "recognitionCache": session.recognition_cache.stats(),
+                        "motion": session.motion.stats(),
+                        "idleSeconds": round(time.monotonic() - session.last_seen, 1)
+                    }
+                    for stream_id, session in self._sessions.items()
+                }
+            }
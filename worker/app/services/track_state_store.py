@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class TrackStateStore:
+    def __init__(self, capacity=32, max_entries=1024, ttl=60.0,
+                 age_window=7, gender_window=7, embedding_window=5, embedding_dim=512):
+        """
+        Temporal smoothing state for the tracks of one stream.
+        Histories live in fixed NumPy ring buffers indexed by slot; a slot is
+        freed when the tracker deletes its track, when it has not been updated
+        for `ttl` seconds, or (least recently used first) past `max_entries`.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.age_window = age_window
+        self.gender_window = gender_window
+        self.embedding_window = embedding_window
+        self.embedding_dim = embedding_dim
+
+        self._slots = OrderedDict()  # track_id -> slot, least recently updated first
+        self._free = []
+        self._allocate(min(capacity, max_entries))
+
+        self.evictions = {"deleted": 0, "ttl": 0, "lru": 0}
+
+    def _allocate(self, capacity):
+        old = getattr(self, "capacity", 0)
+        self.capacity = capacity
+
+        def grow(array, shape, dtype):
+            fresh = np.zeros(shape, dtype=dtype)
+            if array is not None:
+                fresh[:old] = array
+            return fresh
+
+        self.ages = grow(getattr(self, "ages", None), (capacity, self.age_window), np.int16)
+        self.genders = grow(getattr(self, "genders", None), (capacity, self.gender_window), np.int8)
+        self.embeddings = grow(getattr(self, "embeddings", None),
+                               (capacity, self.embedding_window, self.embedding_dim), np.float32)
+        # Total samples ever written per slot; write position is count % window
+        self.age_count = grow(getattr(self, "age_count", None), (capacity,), np.int64)
+        self.gender_count = grow(getattr(self, "gender_count", None), (capacity,), np.int64)
+        self.embedding_count = grow(getattr(self, "embedding_count", None), (capacity,), np.int64)
+        self.last_seen = grow(getattr(self, "last_seen", None), (capacity,), np.float64)
+
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def _slot_for(self, track_id):
+        slot = self._slots.get(track_id)
+        if slot is not None:
+            self._slots.move_to_end(track_id)
+            return slot
+
+        if not self._free:
+            if self.capacity < self.max_entries:
+                self._allocate(min(self.capacity * 2, self.max_entries))
+            else:
+                _, lru_slot = self._slots.popitem(last=False)
+                self._free.append(lru_slot)
+                self.evictions["lru"] += 1
+
+        slot = self._free.pop()
+        self.age_count[slot] = self.gender_count[slot] = self.embedding_count[slot] = 0
+        self._slots[track_id] = slot
+        return slot
+
+    def update(self, track_id, age, gender, embedding):
+        """
+        Records one observation and returns (smoothed_age, smoothed_gender, smoothed_embedding).
+        """
+        slot = self._slot_for(track_id)
+        self.last_seen[slot] = time.monotonic()
+        self._record(slot, age, gender, embedding)
+        return self._smoothed(slot)
+
+    def current(self, track_id):
+        """
+        Smoothed values for a known track without recording a new observation, or None.
+        """
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return None
+        self._slots.move_to_end(track_id)
+        self.last_seen[slot] = time.monotonic()
+        return self._smoothed(slot)
+
+    def _record(self, slot, age, gender, embedding):
+        if age is not None:
+            try:
+                self.ages[slot, self.age_count[slot] % self.age_window] = int(age)
+                self.age_count[slot] += 1
+            except (TypeError, ValueError):
+                pass
+        if gender is not None:
+            try:
+                self.genders[slot, self.gender_count[slot] % self.gender_window] = int(gender)
+                self.gender_count[slot] += 1
+            except (TypeError, ValueError):
+                pass
+        if embedding is not None and len(embedding) == self.embedding_dim:
+            self.embeddings[slot, self.embedding_count[slot] % self.embedding_window] = embedding
+            self.embedding_count[slot] += 1
+
+    def _smoothed(self, slot):
+        # Age: average of history (default 25)
+        n_age = min(self.age_count[slot], self.age_window)
+        smoothed_age = int(self.ages[slot, :n_age].mean()) if n_age else 25
+
+        # Gender: majority voting (0: Female, 1: Male, default 1); ties resolve to 0
+        n_gender = min(self.gender_count[slot], self.gender_window)
+        if n_gender:
+            smoothed_gender = int(np.bincount(self.genders[slot, :n_gender].clip(0, 1), minlength=2).argmax())
+        else:
+            smoothed_gender = 1
+
+        # Embedding: mean vector
+        n_emb = min(self.embedding_count[slot], self.embedding_window)
+        if n_emb:
+            smoothed_embedding = self.embeddings[slot, :n_emb].mean(axis=0)
+        else:
+            smoothed_embedding = np.zeros(self.embedding_dim, dtype=np.float32)
+
+        return smoothed_age, smoothed_gender, smoothed_embedding
+
+    def evict(self, track_ids, reason="deleted"):
+        for track_id in track_ids:
+            slot = self._slots.pop(track_id, None)
+            if slot is not None:
+                self._free.append(slot)
+                self.evictions[reason] += 1
+
+    def prune(self):
+        """
+        Drops entries whose track has not been updated for `ttl` seconds.
+        """
+        cutoff = time.monotonic() - self.ttl
+        stale = []
+        for track_id, slot in self._slots.items():
+            if self.last_seen[slot] >= cutoff:
+                break
+            stale.append(track_id)
+        self.evict(stale, reason="ttl")
+
+    def __len__(self):
+        return len(self._slots)
+
+    def stats(self):
+        return {
+            "liveEntries": len(self._slots),
+            "capacity": self.capacity,
+            "evictions": dict(self.evictions)
+        }
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.core.profiles import get_profile
+from app.services.batch_jobs import batch_jobs
+from app.services.face_detection_service import analyze_frame, stream_sessions
+from app.services.inference_executor import QueueFullError
+from app.services.stream_sessions import StreamSession
+
+# Thumbnail compared between frames for scene-change sampling
+SCENE_THUMB = (64, 36)
+
+# Admission for video jobs, which run on their own threads rather than the inference pool
+video_slots = threading.BoundedSemaphore(max(1, settings.video_max_jobs))
+
+
+def resolve_video_path(path):
+    """
+    `path` relative to VIDEO_DIR (absolute paths must lie under it), resolved
+    through symlinks and confined to it. Video jobs are refused while VIDEO_DIR
+    is unset. Raises PermissionError when not allowed and FileNotFoundError
+    when missing.
+    """
+    if not settings.video_dir:
+        raise PermissionError("Video jobs are disabled; set VIDEO_DIR to the directory they may read")
+    root = os.path.realpath(settings.video_dir)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise PermissionError(f"'{path}' is outside VIDEO_DIR")
+    if not os.path.isfile(full):
+        raise FileNotFoundError(f"Video '{path}' not found")
+    return full
+
+
+class TrackSummary:
+    def __init__(self, track_id, frame_idx, time_ms):
+        """
+        Aggregate of one track over a clip: when it was first/last seen, the
+        embedding recognised on its best-quality sighting, and its smoothed
+        demographics.
+        """
+        self.track_id = track_id
+        self.first_frame = self.last_frame = frame_idx
+        self.first_ms = self.last_ms = time_ms
+        self.sightings = 0
+        self.best_quality = -1.0
+        self.best_frame = frame_idx
+        self.best_bbox = None
+        self.embedding = None
+        self.demographics = None
+
+    def observe(self, face, frame_idx, time_ms, embedding=None):
+        """
+        `embedding` is the one recognised on this frame, None when the frame
+        reused the track's cached state; the face's own is the smoothed mean.
+        """
+        self.last_frame, self.last_ms = frame_idx, time_ms
+        self.sightings += 1
+        # Sharp, frontal and large faces give the most reliable embeddings
+        if face.get("quality") is not None:
+            quality = face["quality"]["score"]
+        else:
+            quality = face["confidence"] * min(1.0, np.sqrt(face["width"] * face["height"]) * 4)
+        if embedding is not None and quality > self.best_quality:
+            self.best_quality = quality
+            self.best_frame = frame_idx
+            self.best_bbox = face["bbox"]
+            self.embedding = embedding
+        # Smoothed values only get better as the track accumulates history
+        self.demographics = face["demographics"]
+
+    def to_dict(self):
+        return {
+            "track_id": self.track_id,
+            "firstSeen": {"frame": self.first_frame, "ms": round(self.first_ms, 1)},
+            "lastSeen": {"frame": self.last_frame, "ms": round(self.last_ms, 1)},
+            "sightings": self.sightings,
+            "bestFrame": self.best_frame,
+            "bestQuality": round(self.best_quality, 4),
+            "bbox": self.best_bbox,
+            "embedding": self.embedding,
+            "demographics": self.demographics
+        }
+
+
+def process_video(path, profile=None, every_n=5, scene_threshold=0.0, job=None):
+    """
+    Runs the tracker-backed pipeline over a video file on a private session.
+    Every `every_n`th frame is analysed; with `scene_threshold` > 0, frames in
+    between are also analysed when their thumbnail differs from the last
+    analysed one by more than that mean absolute difference (0-255).
+    Returns a per-track summary rather than per-frame results.
+    """
+    tier = get_profile(profile or settings.live_profile)
+    session = StreamSession(f"video:{job.job_id if job else os.path.basename(path)}", stream_sessions.tracker_kwargs)
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video '{path}'")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    every_n = max(1, every_n)
+    tracks = {}
+    frame_idx = -1
+    last_thumb = None
+    started = time.monotonic()
+    try:
+        while True:
+            frame_idx += 1
+            sample = frame_idx % every_n == 0
+            # Unsampled frames are only grabbed (no decode) unless scene detection needs pixels
+            if not sample and scene_threshold <= 0:
+                if not capture.grab():
+                    break
+                continue
+            ok, frame = capture.read()
+            if not ok:
+                break
+
+            if scene_threshold > 0:
+                thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_THUMB, interpolation=cv2.INTER_AREA)
+                if not sample and last_thumb is not None:
+                    sample = cv2.absdiff(thumb, last_thumb).mean() > scene_threshold
+                if not sample:
+                    continue
+                last_thumb = thumb
+
+            time_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+            result = analyze_frame(session, frame, tier)
+            for face in result["faces"]:
+                summary = tracks.get(face["track_id"])
+                if summary is None:
+                    summary = tracks[face["track_id"]] = TrackSummary(face["track_id"], frame_idx, time_ms)
+                summary.observe(face, frame_idx, time_ms, session.sightings.get(face["track_id"]))
+            if job is not None:
+                job.record(faces=len(result["faces"]))
+    finally:
+        capture.release()
+        session.close()
+
+    elapsed = time.monotonic() - started
+    video_seconds = frame_idx / fps if fps else 0.0
+    return {
+        "video": {
+            "frames": frame_idx,
+            "fps": round(fps, 2),
+            "seconds": round(video_seconds, 2),
+            "analysedFrames": session.scheduler.keyframes + session.scheduler.roi_frames
+        },
+        "elapsedSeconds": round(elapsed, 2),
+        "realtimeFactor": round(video_seconds / elapsed, 2) if elapsed > 0 else 0.0,
+        "scheduling": session.scheduler.stats(),
+        "tracks": [summary.to_dict() for summary in sorted(tracks.values(), key=lambda t: t.first_frame)]
+    }
+
+
+def start_video_job(path, profile=None, every_n=5, scene_threshold=0.0):
+    """
+    Validates the file and runs process_video on a background thread; progress
+    and the final summary are reported through the batch job registry.
+    Raises QueueFullError when VIDEO_MAX_JOBS jobs are already running.
+    """
+    full_path = resolve_video_path(path)
+    if not video_slots.acquire(blocking=False):
+        raise QueueFullError(f"{settings.video_max_jobs} video job(s) already running")
+    try:
+        capture = cv2.VideoCapture(full_path)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        capture.release()
+
+        # total counts sampled frames; scene changes can add a few more
+        job = batch_jobs.create(-(-total // max(1, every_n)), kind="video")
+
+        def run():
+            try:
+                job.finish(result=process_video(full_path, profile, every_n, scene_threshold, job=job))
+            except Exception as e:
+                job.finish(error=str(e))
+            finally:
+                video_slots.release()
+
+        threading.Thread(target=run, name=f"video-job-{job.job_id}", daemon=True).start()
+    except Exception:
+        video_slots.release()
+        raise
+    return job
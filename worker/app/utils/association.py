@@ -0,0 +1,81 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy is optional; fall back to greedy assignment
+    linear_sum_assignment = None
+
+
+def pairwise_iou(boxes_a, boxes_b):
+    """
+    IoU matrix between two sets of [x1, y1, x2, y2] boxes, shape (len(a), len(b)).
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    inter_x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    inter_y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    inter_x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    inter_y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(inter_x2 - inter_x1, 0, None) * np.clip(inter_y2 - inter_y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _greedy_unique(iou, iou_threshold):
+    rows, cols = np.nonzero(iou > iou_threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols = set(), set()
+    pairs = []
+    for r, c in zip(rows[order], cols[order]):
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def associate(track_boxes, det_boxes, iou_threshold=0.3, method="hungarian"):
+    """
+    One-to-one matching of tracks to detections by IoU.
+    Returns (det_indices, ious): for each track the matched detection index
+    (-1 when no detection overlaps by more than `iou_threshold`) and its IoU.
+    """
+    n_tracks = len(track_boxes)
+    det_indices = np.full(n_tracks, -1, dtype=np.int64)
+    ious = np.zeros(n_tracks, dtype=np.float32)
+    if n_tracks == 0 or len(det_boxes) == 0:
+        return det_indices, ious
+
+    iou = pairwise_iou(track_boxes, det_boxes)
+
+    if method == "hungarian" and linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-iou)
+        pairs = [(r, c) for r, c in zip(rows, cols) if iou[r, c] > iou_threshold]
+    else:
+        pairs = _greedy_unique(iou, iou_threshold)
+
+    for r, c in pairs:
+        det_indices[r] = c
+        ious[r] = iou[r, c]
+    return det_indices, ious
+
+
+def assign_detections(tracks, detections, iou_threshold=0.3, method="hungarian"):
+    """
+    Annotates each tracker output with `det_index` (or -1) pointing into `detections`.
+    """
+    det_indices, _ = associate(
+        [t["bbox"] for t in tracks],
+        [d["bbox"] for d in detections],
+        iou_threshold=iou_threshold,
+        method=method
+    )
+    for track, det_index in zip(tracks, det_indices):
+        track["det_index"] = int(det_index)
+    return tracks
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+# Below this many pixels (short side, full resolution) a face is never worth embedding
+MIN_FACE_SIDE = 20
+# Short side at which size stops limiting quality
+GOOD_FACE_SIDE = 80
+# Laplacian variance of a 64x64 grey face crop that counts as fully sharp
+SHARP_LAPLACIAN_VAR = 120.0
+# Nose height between the eye and mouth lines on the ArcFace template
+FRONTAL_PITCH = 0.5
+
+
+def yaw_pitch(kps):
+    """
+    Head-pose proxies from the 5 SCRFD keypoints (eyes, nose, mouth corners):
+    yaw is the nose offset from the eye midpoint in eye distances (~0 frontal,
+    ±0.5 strongly turned); pitch is the nose height between eye and mouth lines.
+    """
+    eye_mid = (kps[0] + kps[1]) / 2.0
+    mouth_mid = (kps[3] + kps[4]) / 2.0
+    eye_dist = max(float(np.linalg.norm(kps[1] - kps[0])), 1.0)
+    face_height = max(float(mouth_mid[1] - eye_mid[1]), 1.0)
+    yaw = float((kps[2][0] - eye_mid[0]) / eye_dist)
+    pitch = float((kps[2][1] - eye_mid[1]) / face_height)
+    return yaw, pitch
+
+
+def assess(img, face, scale=1.0):
+    """
+    Quality of one detection on `img`, each part in [0, 1]:
+    size (short side in full-resolution pixels, `scale` maps `img` onto it),
+    blur (Laplacian variance), pose (keypoint yaw/pitch) and detector score.
+    `score` is their geometric mean.
+    """
+    x1, y1, x2, y2 = face["bbox"]
+    side = min(x2 - x1, y2 - y1) * scale
+    size = float(np.clip((side - MIN_FACE_SIDE) / (GOOD_FACE_SIDE - MIN_FACE_SIDE), 0.0, 1.0))
+
+    height, width = img.shape[:2]
+    crop = img[max(0, y1):min(height, y2), max(0, x1):min(width, x2)]
+    if crop.size == 0:
+        blur = 0.0
+    else:
+        grey = cv2.resize(cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), (64, 64), interpolation=cv2.INTER_AREA)
+        blur = float(min(1.0, cv2.Laplacian(grey, cv2.CV_32F).var() / SHARP_LAPLACIAN_VAR))
+
+    pose = 1.0
+    if face.get("kps") is not None:
+        yaw, pitch = yaw_pitch(face["kps"])
+        pose = float(np.clip(1.0 - abs(yaw) / 0.6, 0.0, 1.0) * np.clip(1.0 - abs(pitch - FRONTAL_PITCH) / 0.5, 0.0, 1.0))
+
+    det = float(min(1.0, face["det_score"] / 0.6))
+    score = (size * blur * pose * det) ** 0.25
+    return {
+        "score": round(score, 4),
+        "size": round(size, 3),
+        "blur": round(blur, 3),
+        "pose": round(pose, 3),
+        "det": round(det, 3)
+    }
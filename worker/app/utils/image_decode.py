@@ -0,0 +1,113 @@
+import struct
+import threading
+import cv2
+import numpy as np
+
+# libjpeg scales during the IDCT, so these decode a fraction of the pixels
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Start-of-frame markers that carry the image size (baseline, progressive, ...)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data):
+    """
+    (height, width) read from the JPEG frame header without decoding, or None
+    when `data` is not a JPEG.
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 9 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker in SOF_MARKERS:
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return height, width
+        (length,) = struct.unpack(">H", data[pos + 2:pos + 4])
+        pos += 2 + length
+    return None
+
+
+class DecodedImage:
+    def __init__(self, data, target_side_for, min_side=640):
+        """
+        Decodes `data` at the smallest JPEG reduction whose long side still
+        covers the detector input (`target_side_for(full_shape)`) and `min_side`.
+        `img` is that working image; `full` decodes the original resolution on
+        first access, for crops that are too small in `img`.
+        """
+        self._data = data
+        self._full = None
+        self.factor = 1
+
+        size = jpeg_size(data)
+        if size is not None:
+            target = max(target_side_for(size), min_side)
+            long_side = max(size)
+            for factor, flag in REDUCED_FLAGS:
+                if long_side / factor >= target:
+                    self.img = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+                    self.factor = factor
+                    break
+        if self.factor == 1:
+            self.img = self._full = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    @classmethod
+    def from_array(cls, img):
+        """
+        Wraps an already decoded BGR frame (e.g. from cv2.VideoCapture).
+        """
+        decoded = cls.__new__(cls)
+        decoded._data = None
+        decoded.img = decoded._full = img
+        decoded.factor = 1
+        return decoded
+
+    @property
+    def full(self):
+        if self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self._data, np.uint8), cv2.IMREAD_COLOR)
+        return self._full
+
+    @property
+    def full_decoded(self):
+        return self._full is not None
+
+    def full_scale(self):
+        """
+        (x, y) factors mapping `img` coordinates onto `full`.
+        """
+        if self.factor == 1:
+            return 1.0, 1.0
+        height, width = self.full.shape[:2]
+        return width / self.img.shape[1], height / self.img.shape[0]
+
+
+class BufferPool:
+    def __init__(self, max_per_shape=8):
+        """
+        Reusable uint8 arrays keyed by shape, so per-frame scratch images
+        (letterbox canvases) are not reallocated on every call.
+        """
+        self.max_per_shape = max_per_shape
+        self._free = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape):
+        with self._lock:
+            free = self._free.get(shape)
+            if free:
+                return free.pop()
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, buffers):
+        with self._lock:
+            for buf in buffers:
+                free = self._free.setdefault(buf.shape, [])
+                if len(free) < self.max_per_shape:
+                    free.append(buf)
@@ -0,0 +1,88 @@
+import json
+import struct
+import numpy as np
+
+BINARY_MEDIA_TYPE = "application/x-10sight-faces"
+
+MAGIC = b"10SF"
+VERSION = 1
+# magic, version, dtype code, embedding dim, face count, metadata length
+HEADER = struct.Struct("<4sBBHII")
+DTYPES = {"float32": (0, np.dtype("<f4")), "float16": (1, np.dtype("<f2"))}
+DTYPE_CODES = {code: dtype for code, dtype in DTYPES.values()}
+
+
+def to_jsonable(obj):
+    """
+    Converts NumPy arrays and scalars inside a response into plain Python values.
+    """
+    if isinstance(obj, dict):
+        return {k: to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def encode_binary(payload, dtype="float32"):
+    """
+    Packs a detect response into a compact binary frame:
+
+        header   HEADER (16 bytes, little-endian)
+        metadata UTF-8 JSON of the payload, embeddings stripped, each face
+                 carrying `embeddingRow`; space-padded to a 4-byte boundary
+        vectors  count x dim little-endian float32 / float16 rows
+
+    Clients read the vector block straight into a typed array instead of
+    parsing hundreds of JSON floats per face.
+    """
+    dtype_code, np_dtype = DTYPES[dtype]
+    faces = payload.get("result", {}).get("faces", [])
+
+    rows = []
+    meta_faces = []
+    for face in faces:
+        face = dict(face)
+        embedding = face.pop("embedding", None)
+        if embedding is not None and len(embedding):
+            face["embeddingRow"] = len(rows)
+            rows.append(np.asarray(embedding, dtype=np.float32))
+        else:
+            face["embeddingRow"] = -1
+        meta_faces.append(face)
+
+    meta = dict(payload)
+    if "result" in meta:
+        meta["result"] = dict(meta["result"], faces=meta_faces)
+    meta_bytes = json.dumps(to_jsonable(meta), separators=(",", ":")).encode("utf-8")
+    meta_bytes += b" " * (-(HEADER.size + len(meta_bytes)) % 4)
+
+    dim = rows[0].shape[0] if rows else 0
+    vectors = np.vstack(rows).astype(np_dtype) if rows else np.zeros((0, 0), dtype=np_dtype)
+
+    header = HEADER.pack(MAGIC, VERSION, dtype_code, dim, len(rows), len(meta_bytes))
+    return header + meta_bytes + vectors.tobytes()
+
+
+def decode_binary(data):
+    """
+    Inverse of encode_binary; embeddings come back as float32 arrays.
+    """
+    magic, version, dtype_code, dim, count, meta_len = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a 10Sight binary face payload")
+
+    offset = HEADER.size
+    payload = json.loads(data[offset:offset + meta_len].decode("utf-8"))
+    offset += meta_len
+
+    vectors = np.frombuffer(data, dtype=DTYPE_CODES[dtype_code], count=count * dim, offset=offset)
+    vectors = vectors.reshape(count, dim).astype(np.float32)
+
+    for face in payload.get("result", {}).get("faces", []):
+        row = face.pop("embeddingRow", -1)
+        face["embedding"] = vectors[row] if row >= 0 else np.zeros(0, dtype=np.float32)
+    return payload
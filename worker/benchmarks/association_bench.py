@@ -0,0 +1,70 @@
+"""
+Per-frame track/detection association cost vs. face count.
+
+Compares the legacy nested-loop IoU matcher with the vectorized matrix
+plus Hungarian / greedy-unique assignment in app.utils.association.
+
+    python -m benchmarks.association_bench
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.utils.association import associate, linear_sum_assignment
+
+
+def legacy_match(tracks, detections):
+    matches = []
+    for tx1, ty1, tx2, ty2 in tracks:
+        best_match, max_iou = -1, 0
+        for j, (dx1, dy1, dx2, dy2) in enumerate(detections):
+            inter_x1 = max(tx1, dx1)
+            inter_y1 = max(ty1, dy1)
+            inter_x2 = min(tx2, dx2)
+            inter_y2 = min(ty2, dy2)
+            inter_area = max(0, inter_x2 - inter_x1) * max(0, inter_y2 - inter_y1)
+            t_area = (tx2 - tx1) * (ty2 - ty1)
+            d_area = (dx2 - dx1) * (dy2 - dy1)
+            union = t_area + d_area - inter_area
+            iou = inter_area / float(union) if union > 0 else 0
+            if iou > max_iou:
+                max_iou, best_match = iou, j
+        matches.append(best_match if max_iou > 0.3 else -1)
+    return matches
+
+
+def synthetic_scene(n_faces, rng, width=1920, height=1080):
+    size = rng.integers(40, 120, size=(n_faces, 1))
+    x1 = rng.integers(0, width - 120, size=(n_faces, 1))
+    y1 = rng.integers(0, height - 120, size=(n_faces, 1))
+    dets = np.hstack([x1, y1, x1 + size, y1 + size]).astype(int)
+    jitter = rng.integers(-4, 5, size=dets.shape)
+    tracks = dets[rng.permutation(n_faces)] + jitter[:n_faces]
+    return tracks.tolist(), dets.tolist()
+
+
+def time_call(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    repeats = 200
+    print(f"scipy Hungarian available: {linear_sum_assignment is not None}")
+    print(f"{'faces':>6} {'legacy us':>12} {'hungarian us':>14} {'greedy us':>12}")
+    for n_faces in (1, 5, 10, 30, 60, 100):
+        tracks, dets = synthetic_scene(n_faces, rng)
+        legacy = time_call(lambda: legacy_match(tracks, dets), repeats)
+        hungarian = time_call(lambda: associate(tracks, dets, method="hungarian"), repeats)
+        greedy = time_call(lambda: associate(tracks, dets, method="greedy"), repeats)
+        print(f"{n_faces:>6} {legacy:>12.1f} {hungarian:>14.1f} {greedy:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
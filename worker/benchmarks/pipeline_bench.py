@@ -0,0 +1,242 @@
+"""
+End-to-end worker pipeline benchmark, fully offline.
+
+Uses the bundled test_face*.jpg / test_group*.jpg images plus synthetic
+mosaics with a fixed number of faces, and reports:
+
+  * per-stage latency percentiles: decode, detect, recognize, track,
+    associate, serialize
+  * static-mode throughput and latency at several concurrency levels
+  * peak RSS
+
+Results are printed and written as JSON so runs can be compared between
+releases:
+
+    python -m benchmarks.pipeline_bench --output bench.json
+    python -m benchmarks.pipeline_bench --profile forensic --concurrency 1 4 8
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.profiles import get_profile, detection_size
+from app.services.face_detection_service import detect_face, stream_sessions
+from app.services.stream_sessions import StreamSession
+from app.utils.association import assign_detections
+from app.utils.image_decode import DecodedImage
+from app.utils.serialization import to_jsonable, encode_binary
+
+
+def percentiles(samples_ms):
+    values = np.asarray(samples_ms, dtype=np.float64)
+    if not len(values):
+        return {"n": 0}
+    return {
+        "n": int(len(values)),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p90": round(float(np.percentile(values, 90)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+        except (ImportError, AttributeError):
+            return None
+
+
+def bundled_images(pattern):
+    images = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "rb") as f:
+            images[os.path.basename(path)] = f.read()
+    return images
+
+
+def synthetic_mosaic(face_jpeg, n_faces, tile=160):
+    """
+    A JPEG with `n_faces` copies of a portrait laid out on a grid.
+    """
+    face = cv2.imdecode(np.frombuffer(face_jpeg, np.uint8), cv2.IMREAD_COLOR)
+    face = cv2.resize(face, (tile, tile))
+    cols = int(np.ceil(np.sqrt(n_faces)))
+    rows = int(np.ceil(n_faces / cols))
+    canvas = np.full((rows * tile, cols * tile, 3), 127, np.uint8)
+    for i in range(n_faces):
+        r, c = divmod(i, cols)
+        canvas[r * tile:(r + 1) * tile, c * tile:(c + 1) * tile] = face
+    return cv2.imencode(".jpg", canvas, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def bench_stages(images, tier, iterations):
+    """
+    Runs each stage in isolation, in pipeline order, on every image.
+    """
+    engine = model_registry.get(f"insightface:{tier['model']}")
+    stages = {name: [] for name in ("decode", "detect", "recognize", "track", "associate", "serialize")}
+    faces_per_image = {}
+
+    for name, image_bytes in images.items():
+        session = StreamSession(f"bench:{name}", stream_sessions.tracker_kwargs)
+        for _ in range(iterations):
+            decoded, ms = timed(DecodedImage, image_bytes, lambda shape: detection_size(tier, shape)[0],
+                                min_side=settings.decode_min_side)
+            stages["decode"].append(ms)
+            img = decoded.img
+
+            faces, ms = timed(engine.detect, img, det_size=detection_size(tier, img.shape), det_thresh=tier["det_thresh"])
+            stages["detect"].append(ms)
+            faces_per_image[name] = len(faces)
+
+            _, ms = timed(engine.recognize, [img], [(0, face) for face in faces])
+            stages["recognize"].append(ms)
+
+            ds_detections = [
+                ([f["bbox"][0], f["bbox"][1], max(1, f["bbox"][2] - f["bbox"][0]), max(1, f["bbox"][3] - f["bbox"][1])],
+                 f["det_score"], f"face_{i}")
+                for i, f in enumerate(faces)
+            ]
+            tracks, ms = timed(session.tracker.update, ds_detections, img, embeds=[f["embedding"] for f in faces])
+            stages["track"].append(ms)
+
+            _, ms = timed(assign_detections, tracks, faces, iou_threshold=0.3)
+            stages["associate"].append(ms)
+
+            payload = {"faces": [{"bbox": f["bbox"], "embedding": f["embedding"], "age": f["age"]} for f in faces]}
+            _, ms = timed(lambda: (json.dumps(to_jsonable(payload)), encode_binary(payload)))
+            stages["serialize"].append(ms)
+
+    return {name: percentiles(samples) for name, samples in stages.items()}, faces_per_image
+
+
+def bench_concurrency(images, profile, levels, requests_per_level):
+    """
+    Static-mode detect_face calls from N threads at once, as the thread pool would issue them.
+    """
+    payloads = list(images.values())
+    results = {}
+    for level in levels:
+        latencies = []
+
+        def one(i):
+            _, ms = timed(detect_face, payloads[i % len(payloads)], is_static=True, profile=profile)
+            latencies.append(ms)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(one, range(requests_per_level)))
+        elapsed = time.perf_counter() - start
+        results[str(level)] = {
+            "imagesPerSecond": round(requests_per_level / elapsed, 2),
+            "latencyMs": percentiles(latencies)
+        }
+    return results
+
+
+def print_report(report):
+    print(f"\nprofile {report['profile']}  |  peak RSS {report['peakRssMb']} MB  |  model load {report['modelLoadMs']} ms")
+    print(f"\n{'stage':<10} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9}   (ms)")
+    for name, stats in report["stages"].items():
+        print(f"{name:<10} {stats['mean']:>9.2f} {stats['p50']:>9.2f} {stats['p90']:>9.2f} {stats['p99']:>9.2f}")
+    for title, rows in (("by image", report["images"]), ("by face count", report["faceCounts"])):
+        print(f"\n{title:<22} {'faces':>6} {'p50 ms':>9} {'p90 ms':>9}")
+        for name, row in rows.items():
+            total = row["stages"]
+            p50 = sum(stats["p50"] for stats in total.values())
+            p90 = sum(stats["p90"] for stats in total.values())
+            print(f"{name:<22} {row['faces']:>6} {p50:>9.2f} {p90:>9.2f}")
+    print(f"\n{'concurrency':>11} {'img/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for level, row in report["concurrency"].items():
+        print(f"{level:>11} {row['imagesPerSecond']:>9.2f} {row['latencyMs']['p50']:>9.2f} {row['latencyMs']['p99']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default=settings.static_profile)
+    parser.add_argument("--images", default="test_*.jpg", help="glob of bundled images")
+    parser.add_argument("--iterations", type=int, default=20, help="stage runs per image")
+    parser.add_argument("--face-counts", type=int, nargs="*", default=[1, 4, 9, 16])
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    tier = get_profile(args.profile)
+    images = bundled_images(args.images)
+    if not images:
+        parser.error(f"no images match {args.images!r}; run from the worker folder")
+
+    _, load_ms = timed(model_registry.get, f"insightface:{tier['model']}")
+
+    # Warm-up so session initialisation does not land in the percentiles
+    bench_stages({name: data for name, data in list(images.items())[:1]}, tier, 2)
+
+    stages, _ = bench_stages(images, tier, args.iterations)
+    per_image = {}
+    for name, data in images.items():
+        image_stages, faces = bench_stages({name: data}, tier, args.iterations)
+        per_image[name] = {"faces": faces[name], "stages": image_stages}
+
+    portrait = next((data for name, data in images.items() if name.startswith("test_face")), next(iter(images.values())))
+    per_count = {}
+    for count in args.face_counts:
+        name = f"mosaic_{count}"
+        count_stages, faces = bench_stages({name: synthetic_mosaic(portrait, count)}, tier, args.iterations)
+        per_count[name] = {"faces": faces[name], "stages": count_stages}
+
+    report = {
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "profile": args.profile,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "inferenceMode": settings.inference_mode,
+            "inferenceWorkers": settings.inference_workers
+        },
+        "modelLoadMs": round(load_ms, 1),
+        "stages": stages,
+        "images": per_image,
+        "faceCounts": per_count,
+        "concurrency": bench_concurrency(images, args.profile, args.concurrency, args.requests),
+        "peakRssMb": peak_rss_mb()
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
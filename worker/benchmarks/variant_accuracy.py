@@ -0,0 +1,139 @@
+"""
+Accuracy and latency of an INT8 / FP16 weight variant against FP32.
+
+Runs both engines on the bundled test images and reports:
+
+  * detection agreement: variant boxes matched to FP32 boxes (IoU >= 0.5)
+  * recognizer drift: cosine similarity of variant vs FP32 embeddings,
+    both computed on the FP32 detections so only the recognizer differs
+  * detect / recognize latency of each
+
+Exits non-zero when the worst similarity falls below --min-similarity, or when
+a requested variant did not load (the engine would quietly run FP32 instead),
+so it can gate a deployment that sets DET_PRECISION / REC_PRECISION:
+
+    python -m benchmarks.variant_accuracy --pack buffalo_s --det int8 --rec int8
+    python -m benchmarks.variant_accuracy --rec fp16 --min-similarity 0.995 --output drift.json
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from app.engines.insightface_engine import InsightFaceEngine
+from app.engines.onnx_sessions import variant_path
+from app.utils.association import pairwise_iou
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def normalize(rows):
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pack", default="buffalo_s")
+    parser.add_argument("--det", default="fp32", help="detector precision under test")
+    parser.add_argument("--rec", default="fp32", help="recognizer precision under test")
+    parser.add_argument("--images", default="test_*.jpg")
+    parser.add_argument("--det-size", type=int, default=640)
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per image")
+    parser.add_argument("--min-similarity", type=float, default=0.98)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        parser.error(f"no images match {args.images!r}; run from the worker folder")
+
+    det_size = (args.det_size, args.det_size)
+    reference = InsightFaceEngine(model_name=args.pack, det_size=det_size, det_precision="fp32", rec_precision="fp32")
+    variant = InsightFaceEngine(model_name=args.pack, det_size=det_size, det_precision=args.det, rec_precision=args.rec)
+
+    # rebuild_session falls back to FP32; comparing FP32 with itself proves nothing
+    not_loaded = []
+    for role, model, precision in (("detection", variant.det_model, args.det), ("recognition", variant.rec_model, args.rec)):
+        if precision == "fp32":
+            continue
+        wanted = os.path.basename(variant_path(getattr(model, "model_file", None) or role, precision))
+        if variant.model_files.get(role) != wanted:
+            not_loaded.append(f"{role}: requested {wanted}, loaded {variant.model_files.get(role)}")
+
+    similarities, det_matched, det_reference, det_variant = [], 0, 0, 0
+    latency = {"fp32": {"detect": [], "recognize": []}, "variant": {"detect": [], "recognize": []}}
+
+    for path in paths:
+        img = cv2.imread(path)
+        ref_faces = reference.detect(img)
+        var_faces = variant.detect(img)
+        det_reference += len(ref_faces)
+        det_variant += len(var_faces)
+        if ref_faces and var_faces:
+            ious = pairwise_iou([f["bbox"] for f in ref_faces], [f["bbox"] for f in var_faces])
+            det_matched += int((ious.max(axis=1) >= 0.5).sum())
+        if not ref_faces:
+            continue
+
+        # Same FP32 boxes for both recognizers isolates recognizer drift
+        ref_pairs = [(0, dict(face)) for face in ref_faces]
+        var_pairs = [(0, dict(face)) for face in ref_faces]
+        reference.recognize([img], ref_pairs)
+        variant.recognize([img], var_pairs)
+        ref_emb = normalize(np.stack([face["embedding"] for _, face in ref_pairs]))
+        var_emb = normalize(np.stack([face["embedding"] for _, face in var_pairs]))
+        similarities.extend((ref_emb * var_emb).sum(axis=1).tolist())
+
+        for name, engine in (("fp32", reference), ("variant", variant)):
+            for _ in range(args.repeats):
+                faces, ms = timed(engine.detect, img)
+                latency[name]["detect"].append(ms)
+                _, ms = timed(engine.recognize, [img], [(0, face) for face in faces])
+                latency[name]["recognize"].append(ms)
+
+    sims = np.asarray(similarities) if similarities else np.zeros(1)
+    report = {
+        "pack": args.pack,
+        "variant": {"detection": variant.model_files.get("detection"), "recognition": variant.model_files.get("recognition")},
+        "detection": {
+            "fp32Faces": det_reference,
+            "variantFaces": det_variant,
+            "matched": det_matched,
+            "recall": round(det_matched / det_reference, 4) if det_reference else None
+        },
+        "similarity": {
+            "faces": len(similarities),
+            "min": round(float(sims.min()), 5),
+            "mean": round(float(sims.mean()), 5),
+            "p01": round(float(np.percentile(sims, 1)), 5)
+        },
+        "latencyMs": {
+            name: {stage: round(float(np.median(values)), 3) if values else None for stage, values in stages.items()}
+            for name, stages in latency.items()
+        },
+        "notLoaded": not_loaded,
+        "pass": bool(sims.min() >= args.min_similarity) and not not_loaded
+    }
+
+    print(json.dumps(report, indent=2))
+    for message in not_loaded:
+        print(f"FAIL: variant not loaded ({message}); create it with python -m scripts.quantize_models",
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["pass"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Fetches the Caffe age/gender nets used by DemographicsEngine.
+
+    python -m scripts.download_demographics
+    python -m scripts.download_demographics --model-dir /opt/models/demographics
+
+Run once at build time (or bake the files into the image); the engine only
+reads them from disk and fails fast when they are missing.
+"""
+import argparse
+import os
+import sys
+import requests
+
+sys.path.append(os.getcwd())
+
+from app.engines.demographics import MODEL_FILES
+
+BASE_URL = "https://raw.githubusercontent.com/GilLevi/AgeGenderDeepLearning/master"
+MODEL_URLS = {
+    "deploy_age.prototxt": f"{BASE_URL}/age_net_definitions/deploy.prototxt",
+    "age_net.caffemodel": "https://github.com/GilLevi/AgeGenderDeepLearning/raw/master/models/age_net.caffemodel",
+    "deploy_gender.prototxt": f"{BASE_URL}/gender_net_definitions/deploy.prototxt",
+    "gender_net.caffemodel": "https://github.com/GilLevi/AgeGenderDeepLearning/raw/master/models/gender_net.caffemodel"
+}
+
+
+def download(url, path):
+    # Written under a temporary name so an interrupted download is never picked up
+    partial = path + ".part"
+    with requests.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        with open(partial, "wb") as f:
+            for chunk in r.iter_content(1 << 16):
+                f.write(chunk)
+    os.replace(partial, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--force", action="store_true", help="download files that already exist")
+    args = parser.parse_args()
+
+    os.makedirs(args.model_dir, exist_ok=True)
+    for name in MODEL_FILES:
+        path = os.path.join(args.model_dir, name)
+        if os.path.exists(path) and not args.force:
+            print(f"skip  {name} (exists)")
+            continue
+        download(MODEL_URLS[name], path)
+        print(f"wrote {name}: {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
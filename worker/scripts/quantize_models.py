@@ -0,0 +1,73 @@
+"""
+Builds INT8 and FP16 weight variants of a model pack's detector and recognizer.
+
+    python -m scripts.quantize_models --pack buffalo_s
+    python -m scripts.quantize_models --pack buffalo_l --precisions int8
+
+Variants are written to ~/.insightface/models/<pack>/variants/ and picked up
+with DET_PRECISION / REC_PRECISION. INT8 uses ONNX Runtime dynamic
+quantization (weights only, activations quantized at run time); FP16 needs
+`pip install onnx onnxconverter-common` and keeps FP32 inputs/outputs.
+Check the similarity drift with `python -m benchmarks.variant_accuracy`
+before enabling a variant.
+"""
+import argparse
+import glob
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from app.engines.onnx_sessions import variant_path, VARIANTS_DIR
+
+# Detector (SCRFD) and recognizer (ArcFace) files of the buffalo packs
+MODEL_PATTERNS = ("det_*.onnx", "w600k_*.onnx")
+
+
+def quantize_int8(source, target):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    # Unsigned weights: older ONNX Runtime CPU providers (e.g. 1.17) only
+    # implement ConvInteger for uint8, so QInt8 variants fail to load there
+    quantize_dynamic(source, target, weight_type=QuantType.QUInt8, per_channel=True)
+
+
+def convert_fp16(source, target):
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError:
+        raise SystemExit("FP16 conversion needs: pip install onnx onnxconverter-common")
+    model = float16.convert_float_to_float16(onnx.load(source), keep_io_types=True)
+    onnx.save(model, target)
+
+
+BUILDERS = {"int8": quantize_int8, "fp16": convert_fp16}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pack", default="buffalo_s")
+    parser.add_argument("--root", default=os.path.expanduser("~/.insightface/models"))
+    parser.add_argument("--precisions", nargs="*", default=["int8", "fp16"], choices=sorted(BUILDERS))
+    parser.add_argument("--force", action="store_true", help="rebuild variants that already exist")
+    args = parser.parse_args()
+
+    pack_dir = os.path.join(args.root, args.pack)
+    sources = sorted(path for pattern in MODEL_PATTERNS for path in glob.glob(os.path.join(pack_dir, pattern)))
+    if not sources:
+        parser.error(f"no detector/recognizer ONNX files in {pack_dir}; start the worker once to download the pack")
+    os.makedirs(os.path.join(pack_dir, VARIANTS_DIR), exist_ok=True)
+
+    for source in sources:
+        for precision in args.precisions:
+            target = variant_path(source, precision)
+            if os.path.exists(target) and not args.force:
+                print(f"skip  {os.path.relpath(target, pack_dir)} (exists)")
+                continue
+            BUILDERS[precision](source, target)
+            print(f"wrote {os.path.relpath(target, pack_dir)}: "
+                  f"{os.path.getsize(source) / 1e6:.1f} MB -> {os.path.getsize(target) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
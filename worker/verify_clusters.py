@@ -0,0 +1,111 @@
+import numpy as np
+import os
+import sys
+
+# Add the current directory to sys.path to import app modules
+sys.path.append(os.getcwd())
+
+from app.services.face_clusters import FaceClusterer
+from app.services.gallery_index import GalleryIndex, normalize_rows
+
+DIM = 32
+
+
+def direction(degrees, towards=1):
+    # Unit vector in the plane of axis 0 and axis `towards`
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[0] = np.cos(np.radians(degrees))
+    vector[towards] = np.sin(np.radians(degrees))
+    return vector
+
+
+def still(vector, quality=0.9):
+    return (vector, quality, "cam1", None)
+
+
+def sightings(clusters, vectors):
+    # One call per face: faces of one call are matched against the clusters before it
+    return [clusters.assign_many([still(vector)])[0] for vector in vectors]
+
+
+print("Phase 1: Merge")
+clusters = FaceClusterer(dim=DIM, threshold=0.9, merge_threshold=0.6, maintain_every=10 ** 6)
+# 41 degrees apart: too far to join (cos 0.75 < 0.9), close enough to merge (> 0.6)
+a, _, b = sightings(clusters, [direction(0), direction(0), direction(41)])
+assert a != b and len(clusters) == 2
+clusters.maintain()
+assert len(clusters) == 1 and clusters.resolve(b) == a, clusters.stats()
+
+# A bigger neighbour of the merged cluster absorbs it, aliases included
+centroid = normalize_rows(clusters._clusters[a].sum)[0]
+neighbour = 0.75 * centroid + np.sqrt(1 - 0.75 ** 2) * direction(90, towards=2)
+c = sightings(clusters, [neighbour] * 4)[0]
+assert c not in (a, b)
+clusters.maintain()
+assert clusters.resolve(a) == clusters.resolve(b) == c
+assert clusters._aliases == {a: c, b: c}, "aliases must name the survivor directly"
+assert clusters.get(b)["members"] == 7
+print(f"Merges: {clusters.merges}, aliases: {clusters.stats()['aliases']}")
+
+clusters.remove(b)
+assert len(clusters) == 0 and clusters.stats()["aliases"] == 0
+assert clusters.resolve(a) is None and clusters.get(b) is None
+print("SUCCESS: merged ids resolve to the survivor and go with it.")
+
+print("\nPhase 2: Split")
+clusters = FaceClusterer(dim=DIM, threshold=0.3, merge_threshold=0.99, split_threshold=0.2, maintain_every=10 ** 6)
+# Each face joins the drifting centroid, but the ends are 85 degrees apart (cos 0.09 < 0.2)
+ids = sightings(clusters, [direction(angle) for angle in (0, 40, 80, 85)])
+assert len(set(ids)) == 1
+clusters.maintain()
+assert clusters.splits == 1 and len(clusters) == 2, clusters.stats()
+near_start, near_end = clusters.assign_many([still(direction(5)), still(direction(82))], learn=False)
+assert near_start == ids[0] and near_end not in (None, ids[0])
+assert clusters.get(near_start)["members"] + clusters.get(near_end)["members"] == 4
+print(f"Split into {sorted(cluster['id'] for cluster in clusters.list())}")
+
+# At the cluster cap the split evicts another cluster, never the one being split
+clusters = FaceClusterer(dim=DIM, threshold=0.3, merge_threshold=0.99, split_threshold=0.2, max_clusters=2,
+                         maintain_every=10 ** 6)
+ids = sightings(clusters, [direction(angle) for angle in (0, 40, 80, 85)])
+other = sightings(clusters, [direction(90, towards=3)])[0]
+clusters.maintain()
+assert clusters.splits == 1 and clusters.evicted == 1 and ids[0] in clusters._clusters and other not in clusters._clusters
+assert len(clusters.index) == len(clusters) == 2, "split left an orphan row in the index"
+for angle in (0, 85):
+    found = clusters.search(direction(angle), k=5)
+    assert found and {cluster["id"] for cluster in found} <= set(clusters._clusters)
+print("SUCCESS: a cluster of two faces splits along its exemplars.")
+
+print("\nPhase 3: Eviction Prunes Aliases")
+clusters = FaceClusterer(dim=DIM, threshold=0.9, merge_threshold=0.6, max_clusters=2, maintain_every=10 ** 6)
+a, _, b = sightings(clusters, [direction(0), direction(0), direction(41)])
+clusters.maintain()
+assert clusters._aliases == {b: a}
+sightings(clusters, [direction(90, towards=3), direction(90, towards=4)])
+assert clusters.evicted == 1 and clusters.stats()["aliases"] == 0
+assert clusters.resolve(b) is None
+print("SUCCESS: evicting a cluster forgets the ids merged into it.")
+
+print("\nPhase 4: Background IVF Training")
+rng = np.random.default_rng(0)
+vectors = normalize_rows(rng.standard_normal((3000, DIM)).astype(np.float32))
+index = GalleryIndex(dim=DIM, approximate_threshold=2000, n_probe=8, background_train=True)
+index.upsert_many([(i, vector, None) for i, vector in enumerate(vectors)])
+matches = index.search(vectors[:50], k=1)
+assert index._training is not None or index._centroids is not None, "search should have started a fit"
+assert [m[0]["id"] for m in matches] == list(range(50)), "searches stay exact until the fit lands"
+# Writes while the fit runs are reassigned when it is installed
+index.upsert_many([(3000 + i, vector, None) for i, vector in enumerate(vectors[:100])])
+index.remove(7)
+training = index._training
+if training is not None:
+    training.join()
+assert index.stats()["approximate"] and index._centroids is not None
+rows = index._alive_rows()
+expected = np.argmax(index._row_vectors(rows) @ index._centroids.T, axis=1)
+assert (index._assignments[rows] == expected).all(), "rows written during training kept stale lists"
+recall = np.mean([m[0]["id"] in (i, 3000 + i) for i, m in enumerate(index.search(vectors[:100], k=1)) if i != 7])
+assert recall > 0.9, f"recall {recall:.3f}"
+print(f"Lists: {index.stats()['lists']}, recall@1: {recall:.3f}")
+print("SUCCESS: the IVF index trains off the request path.")
@@ -0,0 +1,70 @@
+import os
+import pickle
+import sys
+import tempfile
+
+# Add the current directory to sys.path to import app modules
+sys.path.append(os.getcwd())
+
+from app.services.result_cache import ResultCache
+
+
+def sample_result():
+    return {
+        "faceDetected": True,
+        "totalFaces": 1,
+        "faces": [{"bbox": [10, 20, 110, 140], "embedding": [0.1] * 8, "demographics": {"age": 31}}]
+    }
+
+
+def annotate(result):
+    # What the routes do to a result after the lookup (see annotate_clusters)
+    for face in result["faces"]:
+        face["clusterId"] = 7
+        face["match"] = {"id": "alice", "score": 0.8}
+    result["faces"].append({"bbox": [0, 0, 1, 1]})
+    result["timing"] = {"cached": True}
+
+
+print("Phase 1: Cache Keys")
+cache = ResultCache(max_bytes=1024 * 1024)
+image = b"\xff\xd8 jpeg bytes"
+key = cache.key(image, "accurate|0.5")
+assert key == cache.key(image, "accurate|0.5"), "same image and context must share a key"
+assert key != cache.key(image, "fast|0.5"), "model tier must be part of the key"
+assert key != cache.key(image, "accurate|0.6"), "thresholds must be part of the key"
+assert key != cache.key(image + b"!", "accurate|0.5"), "image content must be part of the key"
+print("SUCCESS: keys follow content, tier and thresholds.")
+
+print("\nPhase 2: Hits Do Not Leak Annotations")
+stored = sample_result()
+cache.put(key, stored)
+annotate(stored)  # the miss path keeps annotating the result it just stored
+first = cache.get(key)
+assert first == sample_result(), f"cached entry changed by its producer: {first}"
+annotate(first)
+second = cache.get(key)
+assert second == sample_result(), f"cache hit leaked annotations: {second}"
+assert second["faces"][0] is not first["faces"][0]
+print(f"Hits: {cache.stats()['hits']}, faces returned: {second['totalFaces']}")
+print("SUCCESS: every hit is a clean copy.")
+
+print("\nPhase 3: Disk Spill And Invalidation")
+with tempfile.TemporaryDirectory() as directory:
+    # Room for one entry in memory; older ones spill to disk
+    entry_bytes = len(pickle.dumps(sample_result(), protocol=pickle.HIGHEST_PROTOCOL))
+    spilling = ResultCache(max_bytes=entry_bytes + 1, disk_dir=directory, disk_max_bytes=1024 * 1024)
+    keys = [spilling.key(bytes([i]), "accurate") for i in range(3)]
+    for k in keys:
+        spilling.put(k, sample_result())
+    assert spilling.stats()["diskEntries"] == 2, spilling.stats()
+    spilled = spilling.get(keys[0])
+    assert spilled == sample_result() and spilling.disk_hits == 1
+    annotate(spilled)
+    assert spilling.get(keys[0]) == sample_result(), "promoted disk entry leaked annotations"
+
+    removed = spilling.invalidate()
+    assert removed == 2 and not os.listdir(directory)
+    assert spilling.get(keys[0]) is None
+    assert spilling.key(bytes([0]), "accurate") != keys[0], "keys from before invalidate must not match"
+print("SUCCESS: spilled entries round-trip and invalidate forgets them.")